@@ -0,0 +1,80 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+class TTLCache:
+    """
+    Ограниченный по размеру LRU-кэш с временем жизни записей.
+    Запись живёт не дольше ttl секунд и не дольше переданного expires_at.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key) -> bool:
+        item = self._data.get(key)
+        return item is not None and item[1] > time.monotonic()
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+        value, deadline = item
+        if deadline <= time.monotonic():
+            # протухшую запись никогда не отдаём
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, expires_at: datetime | None = None):
+        if self.maxsize <= 0:
+            return
+        now = time.monotonic()
+        deadline = now + self.ttl
+        if expires_at is not None:
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            left = (expires_at - datetime.now(timezone.utc)).total_seconds()
+            if left <= 0:
+                self.pop(key)
+                return
+            deadline = min(deadline, now + left)
+
+        self._data[key] = (value, deadline)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key):
+        item = self._data.pop(key, None)
+        return None if item is None else item[0]
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -11,6 +11,111 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
 
+    # пул соединений с БД и кэш подготовленных выражений asyncpg
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # работа за транзакционным пулером (PgBouncer): без кэша подготовленных выражений.
+    # Долгие соединения сеанса (advisory-блокировки лидера) идут мимо пула запросов, по DB_DIRECT_URL
+    # или, если он пуст, по основному адресу; за PgBouncer без DB_DIRECT_URL задачи лидера не запускаются
+    DB_PGBOUNCER: bool = False
+    DB_DIRECT_URL: str = ''
+
+    # реплики для чтения: URL через запятую; пусто - всё читается с основной БД
+    DB_REPLICA_URLS: str = ''
+    DB_REPLICA_HEALTH_INTERVAL: float = 5.0
+    DB_REPLICA_HEALTH_TIMEOUT: float = 2.0
+    # сколько секунд после записи читать с основной БД (read-your-writes), с запасом на отставание реплик
+    DB_REPLICA_READ_YOUR_WRITES: float = 5.0
+
+    # одна сессия БД и одна транзакция на запрос для изменяющих обработчиков
+    REQUEST_SCOPED_SESSION: bool = True
+
+    # кэш коротких ссылок для редиректа, свой в каждом процессе. Изменение и удаление ссылки другие
+    # процессы узнают через LISTEN/NOTIFY (app.links.events); без подписки (PgBouncer без DB_DIRECT_URL)
+    # или во время её обрыва они отдают старый URL до LINK_CACHE_TTL секунд
+    LINK_CACHE_SIZE: int = 10000
+    LINK_CACHE_TTL: float = 60.0
+
+    # кэш пользователей по id и проверенных токенов; между процессами сброс не передаётся,
+    # поэтому изменения пользователя в других процессах видны не позже чем через USER_CACHE_TTL
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL: float = 30.0
+    TOKEN_CACHE_SIZE: int = 10000
+    TOKEN_CACHE_TTL: float = 300.0
+
+    # bcrypt: стоимость хэша и пул потоков, сверх BCRYPT_MAX_PENDING запросов в очереди - 503
+    BCRYPT_ROUNDS: int = 12
+    BCRYPT_WORKERS: int = 2
+    BCRYPT_MAX_PENDING: int = 32
+
+    # фильтр Блума существующих коротких ссылок, свой в каждом процессе; созданные и удалённые
+    # другими воркерами коды приходят через LISTEN/NOTIFY (нужно соединение DB_DIRECT_URL при PgBouncer).
+    # Пока подписка не работает, фильтр не используется; периодическая перестройка только чистит
+    # ложноположительные коды
+    LINK_FILTER_ENABLED: bool = False
+    LINK_FILTER_CAPACITY: int = 1000000
+    LINK_FILTER_ERROR_RATE: float = 0.01
+    LINK_FILTER_REBUILD_INTERVAL: float = 3600.0
+    # как часто проверять соединение подписки на изменения ссылок (сек)
+    LINK_EVENTS_PING_INTERVAL: float = 5.0
+
+    # генерация коротких ссылок: hash - хэш URL с проверкой коллизий, counter - счётчик блоками (hi/lo),
+    # pool - заранее сгенерированные коды из таблицы reserved_codes
+    SHORT_CODE_ALLOCATOR: str = "hash"
+    SHORT_CODE_MAX_ATTEMPTS: int = 2000
+    SHORT_CODE_BLOCK_SIZE: int = 1000
+    SHORT_CODE_PERMUTE: bool = True
+    SHORT_CODE_POOL_LOW: int = 100
+    SHORT_CODE_POOL_HIGH: int = 1000
+    SHORT_CODE_POOL_RESERVE: int = 10000
+    SHORT_CODE_POOL_CODE_LENGTH: int = 8
+
+    # сортировать параметры запроса при канонизации URL (менять только вместе с пересчётом original_URL_hash)
+    URL_SORT_QUERY: bool = False
+
+    # постраничная выдача списка ссылок
+    LINKS_PAGE_SIZE: int = 100
+    LINKS_PAGE_MAX: int = 1000
+    # строк за одно обращение к серверному курсору при выгрузке
+    LINKS_EXPORT_BATCH: int = 1000
+
+    # максимальное число ссылок в POST /links/shorten/batch
+    LINK_BATCH_MAX_SIZE: int = 1000
+
+    # удаление протухших ссылок: период (сек) и размер одного DELETE
+    EXPIRY_SWEEP_INTERVAL: float = 60.0
+    EXPIRY_SWEEP_CHUNK: int = 1000
+    # точное удаление в момент истечения: окно подгрузки из БД (сек), размер пачки и как часто
+    # лидер пересканирует окно, чтобы подхватить ссылки, созданные другими воркерами (сек)
+    EXPIRY_SCHEDULER_HORIZON: float = 300.0
+    EXPIRY_SCHEDULER_BATCH: int = 1000
+    EXPIRY_SCHEDULER_RESCAN: float = 10.0
+
+    # секционирование links по сроку жизни: флаг читает только миграция 0005, приложение смотрит
+    # на фактическую схему; ширина корзины в сутках, сколько корзин создавать заранее
+    # и как часто обслуживать разделы (сек)
+    LINKS_PARTITIONED: bool = False
+    LINKS_PARTITION_DAYS: int = 7
+    LINKS_PARTITION_PREMAKE: int = 4
+    LINKS_PARTITION_MAINTENANCE_INTERVAL: float = 3600.0
+
+    # фоновые задачи выполняет один процесс-лидер; период продления и перевыборов (сек)
+    LEADER_RENEW_INTERVAL: float = 5.0
+
+    # учёт переходов: buffered - через буфер, strict - один UPDATE ... RETURNING на каждый переход
+    CLICK_MODE: str = "buffered"
+
+    # буфер переходов: сброс по таймеру (сек), по порогу, максимум коротких кодов в памяти
+    # и предельная пауза между попытками сброса при недоступной БД (сек)
+    CLICK_FLUSH_INTERVAL: float = 5.0
+    CLICK_FLUSH_THRESHOLD: int = 1000
+    CLICK_BUFFER_MAX_PENDING: int = 50000
+    CLICK_FLUSH_MAX_BACKOFF: float = 60.0
+
     model_config = SettingsConfigDict(
         env_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".env")
     )
@@ -24,5 +129,16 @@ def get_db_url():
             f"{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}")
 
 
+def get_direct_db_url() -> str:
+    if settings.DB_DIRECT_URL:
+        return settings.DB_DIRECT_URL
+    # за транзакционным пулером основной адрес для соединений сеанса не годится
+    return '' if settings.DB_PGBOUNCER else get_db_url()
+
+
+def get_replica_urls() -> list[str]:
+    return [url.strip() for url in settings.DB_REPLICA_URLS.split(',') if url.strip()]
+
+
 def get_auth_data():
     return {"secret_key": settings.SECRET_KEY, "algorithm": settings.ALGORITHM}
\ No newline at end of file
@@ -1,8 +1,18 @@
-from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.future import select
-from sqlalchemy import update as sqlalchemy_update, delete as sqlalchemy_delete
-from app.database import async_session_maker
+from sqlalchemy import any_, bindparam, column, values, update as sqlalchemy_update, delete as sqlalchemy_delete
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.database import session_scope
+from app.metrics import observe_dao
 
+# предел числа параметров в одном запросе asyncpg
+MAX_QUERY_PARAMS = 32767
+# ключей в одном DELETE ... = ANY(:keys) у delete_many
+DELETE_MANY_CHUNK = 10000
+
+# готовые SELECT по (модели, набору ключей фильтра) с параметрами вместо значений:
+# построение выражения и его ключа кэша компиляции дороже, чем выполнение готового
+_select_cache: dict[tuple, object] = {}
 
 
 
@@ -10,70 +20,239 @@ from app.database import async_session_maker
 class BaseDAO:
     model = None
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        observe_dao(cls)
+
+    @classmethod
+    def _select_by(cls, filter_by: dict, columns: tuple = ()):
+        """
+        Закэшированный SELECT модели (или только колонок columns) с фильтром filter_by
+        и параметры для него. Значение None сравнивается через IS NULL, как в filter_by.
+        """
+        shape = tuple(sorted((key, value is None) for key, value in filter_by.items()))
+        cache_key = (cls.model, columns, shape)
+        query = _select_cache.get(cache_key)
+        if query is None:
+            query = select(*[getattr(cls.model, c) for c in columns]) if columns else select(cls.model)
+            query = query.where(*[
+                getattr(cls.model, key).is_(None) if is_null else getattr(cls.model, key) == bindparam(key)
+                for key, is_null in shape
+            ])
+            _select_cache[cache_key] = query
+        return query, {key: value for key, value in filter_by.items() if value is not None}
+
     @classmethod
     async def find_all(cls, **filter_by):
-        async with async_session_maker() as session:
-            query = select(cls.model).filter_by(**filter_by)
-            result = await session.execute(query)
+        async with session_scope() as session:
+            query, params = cls._select_by(filter_by)
+            result = await session.execute(query, params)
             return result.scalars().all()
 
     @classmethod
-    async def find_one_or_none_by_id(cls, data_id: int):
-        async with async_session_maker() as session:
-            query = select(cls.model).filter_by(id=data_id)
+    async def iter_all(cls, batch_size: int = 1000, **filter_by):
+        """
+        Все строки по одной через серверный курсор, по batch_size за обращение к БД.
+        """
+        async with session_scope(shared=False) as session:
+            query = select(cls.model).filter_by(**filter_by).order_by(cls.model.id)
+            result = await session.stream_scalars(query.execution_options(yield_per=batch_size))
+            async for row in result:
+                yield row
+
+    @classmethod
+    async def find_page(cls, limit: int, after_id: int | None = None, columns: tuple = (), **filter_by):
+        """
+        Страница строк по возрастанию id, начиная после after_id (keyset-пагинация);
+        columns - какие колонки вернуть вместо целых объектов.
+        """
+        async with session_scope() as session:
+            if columns:
+                query = select(*[getattr(cls.model, c) for c in columns])
+            else:
+                query = select(cls.model)
+            query = query.filter_by(**filter_by)
+            if after_id is not None:
+                query = query.where(cls.model.id > after_id)
+            query = query.order_by(cls.model.id).limit(limit)
             result = await session.execute(query)
+            return result.all() if columns else result.scalars().all()
+
+    @classmethod
+    async def find_one_or_none_by_id(cls, data_id: int):
+        async with session_scope() as session:
+            query, params = cls._select_by({'id': data_id})
+            result = await session.execute(query, params)
             return result.scalar_one_or_none()
 
     @classmethod
     async def find_one_or_none(cls, **filter_by):
-        async with async_session_maker() as session:
-            query = select(cls.model).filter_by(**filter_by)
-            result = await session.execute(query)
+        async with session_scope() as session:
+            query, params = cls._select_by(filter_by)
+            result = await session.execute(query, params)
             return result.scalar_one_or_none()
 
+    @classmethod
+    async def find_one_row(cls, columns: tuple, **filter_by):
+        """
+        Только колонки columns одной строки: Row без объекта ORM и без identity map.
+        Для обработчиков, которые ничего не меняют через сессию.
+        """
+        async with session_scope() as session:
+            query, params = cls._select_by(filter_by, columns)
+            result = await session.execute(query, params)
+            return result.one_or_none()
+
     @classmethod
     async def add(cls, **values):
-        async with async_session_maker() as session:
-            async with session.begin():
-                new_instance = cls.model(**values)
-                session.add(new_instance)
-                try:
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    await session.rollback()
-                    raise e
-                return new_instance
+        async with session_scope(write=True) as session:
+            new_instance = cls.model(**values)
+            session.add(new_instance)
+            await session.flush()
+            return new_instance
+
+    @classmethod
+    async def insert_or_get(cls, get_by: dict, **values):
+        """
+        Вставка одним INSERT ... ON CONFLICT DO NOTHING RETURNING.
+        При конфликте возвращает существующую запись, найденную по фильтру get_by.
+        Результат - пара (запись или None, создана ли запись).
+        """
+        async with session_scope(write=True) as session:
+            query = pg_insert(cls.model).values(**values).on_conflict_do_nothing().returning(cls.model)
+            result = await session.execute(query)
+            instance = result.scalar_one_or_none()
+            if instance is not None:
+                return instance, True
+            query = select(cls.model).filter_by(**get_by)
+            result = await session.execute(query)
+            return result.scalar_one_or_none(), False
+
+    @classmethod
+    async def add_many(cls, rows: list[dict], returning: tuple = ('id',)):
+        """
+        Вставляет строки многострочным INSERT ... ON CONFLICT DO NOTHING.
+        Возвращает только реально вставленные строки с колонками из returning.
+        """
+        if not rows:
+            return []
+        chunk_size = max(MAX_QUERY_PARAMS // len(rows[0]), 1)
+        inserted = []
+        async with session_scope(write=True) as session:
+            for start in range(0, len(rows), chunk_size):
+                query = (
+                    pg_insert(cls.model)
+                    .values(rows[start:start + chunk_size])
+                    .on_conflict_do_nothing()
+                    .returning(*[getattr(cls.model, c) for c in returning])
+                )
+                result = await session.execute(query)
+                inserted.extend(result.all())
+        return inserted
+
+    @classmethod
+    async def find_all_in(cls, column: str, keys: list, columns: tuple = ()):
+        """
+        Строки, у которых column входит в keys; columns - какие колонки вернуть.
+        """
+        if not keys:
+            return []
+        field = getattr(cls.model, column)
+        async with session_scope() as session:
+            query = select(*[getattr(cls.model, c) for c in columns or (column,)]).where(field.in_(keys))
+            result = await session.execute(query)
+            return result.all()
 
     @classmethod
     async def update(cls, filter_by, **values):
-        async with async_session_maker() as session:
-            async with session.begin():
+        async with session_scope(write=True) as session:
+            query = (
+                sqlalchemy_update(cls.model)
+                .where(*[getattr(cls.model, k) == v for k, v in filter_by.items()])
+                .values(**values)
+                .execution_options(synchronize_session="fetch")
+            )
+            result = await session.execute(query)
+            return result.rowcount
+
+    @classmethod
+    async def update_many(cls, key: str, rows: list[dict], increment: tuple = (), shared: bool = True) -> int:
+        """
+        Каждой строке свои значения одним UPDATE ... FROM (VALUES ...) на пачку.
+        rows - словари с колонкой key и новыми значениями (у всех одинаковый набор колонок),
+        колонки из increment не присваиваются, а прибавляются. Возвращает число обновлённых строк.
+        """
+        if not rows:
+            return 0
+        columns = list(rows[0])
+        chunk_size = max(MAX_QUERY_PARAMS // len(columns), 1)
+        updated = 0
+        async with session_scope(write=True, shared=shared) as session:
+            for start in range(0, len(rows), chunk_size):
+                new_values = values(
+                    *[column(c, getattr(cls.model, c).type) for c in columns], name='new_values'
+                ).data([tuple(row[c] for c in columns) for row in rows[start:start + chunk_size]])
                 query = (
                     sqlalchemy_update(cls.model)
-                    .where(*[getattr(cls.model, k) == v for k, v in filter_by.items()])
-                    .values(**values)
-                    .execution_options(synchronize_session="fetch")
+                    .where(getattr(cls.model, key) == new_values.c[key])
+                    .values({
+                        c: getattr(cls.model, c) + new_values.c[c] if c in increment else new_values.c[c]
+                        for c in columns if c != key
+                    })
+                    .execution_options(synchronize_session=False)
                 )
                 result = await session.execute(query)
-                try:
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    await session.rollback()
-                    raise e
-                return result.rowcount
+                updated += result.rowcount
+        return updated
+
+    @classmethod
+    async def delete_many(cls, key: str, keys: list, conditions: tuple = (), chunk_size: int = DELETE_MANY_CHUNK) -> int:
+        """
+        Удаляет строки, у которых key входит в keys: DELETE ... WHERE key = ANY(:keys) по chunk_size ключей,
+        с одним параметром-массивом на запрос. Возвращает число удалённых строк.
+        """
+        if not keys:
+            return 0
+        field = getattr(cls.model, key)
+        query = (
+            sqlalchemy_delete(cls.model)
+            .where(field == any_(bindparam('keys', type_=ARRAY(field.type))), *conditions)
+            .execution_options(synchronize_session=False)
+        )
+        deleted = 0
+        async with session_scope(write=True) as session:
+            for start in range(0, len(keys), chunk_size):
+                result = await session.execute(query, {'keys': list(keys[start:start + chunk_size])})
+                deleted += result.rowcount
+        return deleted
 
     @classmethod
     async def delete(cls, delete_all: bool = False, **filter_by):
         if not delete_all and not filter_by:
             raise ValueError("Необходимо указать хотя бы один параметр для удаления.")
 
-        async with async_session_maker() as session:
-            async with session.begin():
-                query = sqlalchemy_delete(cls.model).filter_by(**filter_by)
-                result = await session.execute(query)
-                try:
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    await session.rollback()
-                    raise e
-                return result.rowcount
\ No newline at end of file
+        async with session_scope(write=True) as session:
+            query = sqlalchemy_delete(cls.model).filter_by(**filter_by)
+            result = await session.execute(query)
+            return result.rowcount
+
+    @classmethod
+    async def increment(cls, filter_by: dict, column: str, step: int = 1, returning: tuple = (), conditions: tuple = ()):
+        """
+        Атомарно выполняет column = column + step одним UPDATE ... RETURNING.
+        Возвращает строку с колонками из returning или None, если ничего не обновлено.
+        """
+        async with session_scope(write=True) as session:
+            field = getattr(cls.model, column)
+            query = (
+                sqlalchemy_update(cls.model)
+                .where(*[getattr(cls.model, k) == v for k, v in filter_by.items()], *conditions)
+                .values({field: field + step})
+                .returning(*[getattr(cls.model, c) for c in returning or (column,)])
+                .execution_options(synchronize_session=False)
+            )
+            result = await session.execute(query)
+            return result.one_or_none()
+
+
+observe_dao(BaseDAO)
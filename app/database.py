@@ -1,17 +1,230 @@
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
 from datetime import datetime
 from typing import Annotated
+from uuid import uuid4
 
-from sqlalchemy import func
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncAttrs
+from sqlalchemy import func, text
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncAttrs, AsyncSession
 from sqlalchemy.orm import DeclarativeBase, declared_attr, Mapped, mapped_column
 
-from app.config import get_db_url
+from app.config import get_db_url, get_direct_db_url, get_replica_urls, settings
+from app.metrics import count_queries
 
 DATABASE_URL = get_db_url()
 
-engine = create_async_engine(DATABASE_URL)
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, который считает время ожидания свободного соединения.
+    Счётчики свои у каждого пула: ожидания на репликах не смешиваются с основной БД.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            self.waits += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+def engine_options() -> dict:
+    # кэш подготовленных выражений диалекта asyncpg в SQLAlchemy (на соединение)
+    connect_args = {"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    if settings.DB_PGBOUNCER:
+        # за транзакционным пулером подготовленные выражения не переживают смену серверного соединения
+        connect_args = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+
+engine = create_async_engine(DATABASE_URL, **engine_options())
+count_queries(engine)
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
+# долгоживущие соединения сеанса (advisory-блокировки лидера) - без пула: они не занимают
+# соединения запросов, не искажают /stats/pool и закрываются сразу после освобождения
+DIRECT_URL = get_direct_db_url()
+direct_engine = create_async_engine(DIRECT_URL, poolclass=NullPool) if DIRECT_URL else None
+
+
+def pool_stats(db_engine=engine) -> dict:
+    pool = db_engine.sync_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "waits": pool.waits,
+        "wait_seconds_total": pool.wait_seconds_total,
+        "wait_seconds_max": pool.wait_seconds_max,
+    }
+
+
+class ReplicaSet:
+    """
+    Реплики для чтения: сессии раздаются по кругу среди живых реплик,
+    живость проверяется фоновым SELECT 1. Без живых реплик читаем с основной БД.
+    """
+
+    def __init__(self, urls: list[str]):
+        self.urls = urls
+        self.engines = [create_async_engine(url, **engine_options()) for url in urls]
+        for replica_engine in self.engines:
+            count_queries(replica_engine)
+        self.session_makers = [async_sessionmaker(e, expire_on_commit=False) for e in self.engines]
+        self.healthy = [True] * len(urls)
+        self._turn = itertools.count()
+        self.primary_fallbacks = 0
+
+    def session_maker(self) -> async_sessionmaker:
+        alive = [maker for maker, ok in zip(self.session_makers, self.healthy) if ok]
+        if not alive:
+            if self.session_makers:
+                self.primary_fallbacks += 1
+            return async_session_maker
+        return alive[next(self._turn) % len(alive)]
+
+    async def _ping(self, replica_engine):
+        async with replica_engine.connect() as connection:
+            await connection.execute(text('SELECT 1'))
+
+    async def check(self):
+        for i, replica_engine in enumerate(self.engines):
+            try:
+                await asyncio.wait_for(self._ping(replica_engine), settings.DB_REPLICA_HEALTH_TIMEOUT)
+                ok = True
+            except Exception as e:
+                ok = False
+                if self.healthy[i]:
+                    print(f"Реплика {replica_engine.url.host} недоступна: {e!r}")
+            if ok and not self.healthy[i]:
+                print(f"Реплика {replica_engine.url.host} снова доступна")
+            self.healthy[i] = ok
+
+    async def run(self):
+        if not self.engines:
+            return
+        while True:
+            await self.check()
+            await asyncio.sleep(settings.DB_REPLICA_HEALTH_INTERVAL)
+
+    def stats(self) -> list[dict]:
+        return [
+            {"host": e.url.host, "healthy": ok, "checked_out": e.sync_engine.pool.checkedout(),
+             "waits": e.sync_engine.pool.waits, "wait_seconds_total": e.sync_engine.pool.wait_seconds_total}
+            for e, ok in zip(self.engines, self.healthy)
+        ]
+
+
+replica_set = ReplicaSet(get_replica_urls())
+
+# читать с основной БД: явно через primary_reads() или до primary_until (time.monotonic())
+# после записи в этом контексте - read-your-writes, не привязывающий фоновые задачи к основной БД навсегда
+use_primary: ContextVar[bool] = ContextVar('use_primary', default=False)
+primary_until: ContextVar[float] = ContextVar('primary_until', default=0.0)
+
+
+@contextmanager
+def primary_reads():
+    token = use_primary.set(True)
+    try:
+        yield
+    finally:
+        use_primary.reset(token)
+
+
+# сессия текущего запроса (unit of work), если обработчик её открыл
+current_session: ContextVar[AsyncSession | None] = ContextVar('current_session', default=None)
+
+
+@asynccontextmanager
+async def session_scope(write: bool = False, shared: bool = True):
+    """
+    Сессия для одного вызова DAO. Внутри запроса с общей сессией возвращает её,
+    фиксацию тогда делает request_session; иначе открывает свою сессию,
+    а для записи - и свою транзакцию. shared=False - всегда своя сессия
+    (для служебной записи, которая не должна откатываться вместе с запросом).
+    Чтение вне общей сессии идёт на реплику, если они настроены.
+    """
+    session = current_session.get() if shared else None
+    if session is not None:
+        yield session
+        return
+    if write:
+        # чтения в этом контексте вскоре после записи не должны отставать от записанного
+        primary_until.set(time.monotonic() + settings.DB_REPLICA_READ_YOUR_WRITES)
+        async with async_session_maker() as session:
+            async with session.begin():
+                yield session
+        return
+    if use_primary.get() or time.monotonic() < primary_until.get():
+        session_maker = async_session_maker
+    else:
+        session_maker = replica_set.session_maker()
+    async with session_maker() as session:
+        yield session
+
+
+def after_commit(callback):
+    """
+    Выполнить callback после COMMIT общей сессии запроса (при откате - не выполнять).
+    Вне общей сессии запись уже зафиксирована своей транзакцией, и callback выполняется сразу.
+    """
+    session = current_session.get()
+    if session is None:
+        callback()
+    else:
+        session.info.setdefault('after_commit', []).append(callback)
+
+
+async def request_session():
+    """
+    Зависимость FastAPI: все вызовы DAO в обработчике идут через одну сессию
+    и одну транзакцию с одним COMMIT в конце. Подключать с scope="function",
+    чтобы COMMIT (и его ошибка) произошёл до отправки ответа.
+    """
+    if not settings.REQUEST_SCOPED_SESSION:
+        yield None
+        return
+    async with async_session_maker() as session:
+        token = current_session.set(session)
+        try:
+            async with session.begin():
+                yield session
+        finally:
+            try:
+                current_session.reset(token)
+            except ValueError:
+                current_session.set(None)
+        for callback in session.info.pop('after_commit', []):
+            callback()
+
 # настройка аннотаций
 int_pk = Annotated[int, mapped_column(primary_key=True)]
 created_at = Annotated[datetime, mapped_column(server_default=func.now())]
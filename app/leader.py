@@ -0,0 +1,108 @@
+import asyncio
+import hashlib
+
+from sqlalchemy import select, func
+
+from app.config import settings
+from app.database import direct_engine
+
+
+class LeaderLock:
+    """
+    Лидерство процесса для фоновой задачи через pg_try_advisory_lock.
+    Блокировка принадлежит отдельному соединению и держится, пока оно живо:
+    если лидер падает, PostgreSQL снимает блокировку, и её забирает другой процесс.
+    """
+
+    def __init__(self, name: str, renew_timeout: float):
+        self.name = name
+        self.key = int.from_bytes(hashlib.blake2b(name.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+        self.renew_timeout = renew_timeout
+        self._connection = None
+        self.is_leader = False
+        self.elections = 0
+
+    async def try_acquire(self) -> bool:
+        connection = await direct_engine.connect()
+        try:
+            connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+            result = await connection.execute(select(func.pg_try_advisory_lock(self.key)))
+            acquired = bool(result.scalar())
+        except Exception:
+            await connection.close()
+            raise
+        if not acquired:
+            await connection.close()
+            return False
+        self._connection = connection
+        self.is_leader = True
+        self.elections += 1
+        return True
+
+    async def renew(self) -> bool:
+        """
+        Продление аренды: проверяем, что соединение с блокировкой живо.
+        """
+        try:
+            await asyncio.wait_for(self._connection.execute(select(1)), timeout=self.renew_timeout)
+            return True
+        except Exception:
+            await self.release()
+            return False
+
+    async def release(self):
+        connection, self._connection = self._connection, None
+        self.is_leader = False
+        if connection is None:
+            return
+        try:
+            await connection.execute(select(func.pg_advisory_unlock(self.key)))
+        except Exception:
+            pass
+        try:
+            await connection.close()
+        except Exception:
+            # соединение уже мертво - сервер снимет блокировку сам
+            await connection.invalidate()
+
+
+leader_locks: dict[str, LeaderLock] = {}
+
+
+async def run_as_leader(name: str, job, renew_interval: float = None):
+    """
+    Запускает job() только в процессе, который держит блокировку name.
+    При потере лидерства задача останавливается, остальные процессы
+    пытаются стать лидером каждые renew_interval секунд.
+    """
+    if direct_engine is None:
+        print(f"Задача {name} не запущена: при DB_PGBOUNCER для выбора лидера нужен DB_DIRECT_URL")
+        return
+    renew_interval = renew_interval or settings.LEADER_RENEW_INTERVAL
+    lock = leader_locks[name] = LeaderLock(name, renew_timeout=renew_interval)
+    task = None
+    try:
+        while True:
+            try:
+                leader = await lock.renew() if lock.is_leader else await lock.try_acquire()
+            except Exception as e:
+                print(f"Ошибка выбора лидера для {name}: {str(e)}")
+                leader = False
+
+            if leader and (task is None or task.done()):
+                print(f"Процесс стал лидером для {name}")
+                task = asyncio.create_task(job())
+            elif not leader and task is not None:
+                print(f"Процесс потерял лидерство для {name}")
+                task.cancel()
+                task = None
+            await asyncio.sleep(renew_interval)
+    finally:
+        if task is not None:
+            task.cancel()
+        await lock.release()
+
+
+async def release_all():
+    for lock in leader_locks.values():
+        await lock.release()
@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import secrets
+from collections import deque
+
+from app.config import settings
+from app.links.coder import short_url
+from app.links.dao import LinksDAO, ReservedCodesDAO
+
+BASE62_ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+# 40-битное пространство идентификаторов помещается в 7 символов base62
+ID_BITS = 40
+CODE_LENGTH = 7
+
+
+def base62_encode(number: int, length: int = 0) -> str:
+    if number < 0:
+        raise ValueError("Число должно быть неотрицательным")
+    chars = []
+    while number:
+        number, rest = divmod(number, 62)
+        chars.append(BASE62_ALPHABET[rest])
+    return ''.join(reversed(chars)).rjust(max(length, 1), BASE62_ALPHABET[0])
+
+
+def permute_id(number: int, key: bytes, rounds: int = 4) -> int:
+    """
+    Обратимая перестановка 40-битного числа (сеть Фейстеля):
+    разные идентификаторы дают разные коды, но соседние коды не угадываются.
+    """
+    if not 0 <= number < 1 << ID_BITS:
+        raise ValueError("Идентификатор вне диапазона коротких кодов")
+    half = ID_BITS // 2
+    mask = (1 << half) - 1
+    left, right = number >> half, number & mask
+    for i in range(rounds):
+        digest = hashlib.blake2b(right.to_bytes(4, 'little') + bytes([i]), key=key, digest_size=4).digest()
+        left, right = right, left ^ (int.from_bytes(digest, 'little') & mask)
+    return (left << half) | right
+
+
+class HashAllocator:
+    """
+    Исходная стратегия: случайная перестановка хэша URL с проверкой коллизий в БД.
+    """
+
+    def __init__(self, max_attempts: int = 2000):
+        self.max_attempts = max_attempts
+
+    async def allocate(self, original_URL: str) -> str | None:
+        for _ in range(self.max_attempts):
+            code = short_url(original_URL)
+            if await LinksDAO.find_one_or_none(short_URL=code) is None:
+                return code
+        return None
+
+    async def next_code(self, original_URL: str) -> str:
+        # без проверки в БД: занятость кода проверит сама вставка
+        return short_url(original_URL)
+
+    async def allocate_many(self, original_URLs: list[str]) -> list[str | None]:
+        """
+        Коды для пачки ссылок: коллизии проверяются одним запросом на всю пачку за попытку.
+        """
+        codes: list[str | None] = [short_url(url) for url in original_URLs]
+        pending = list(range(len(codes)))
+        for _ in range(self.max_attempts):
+            taken = {row[0] for row in await LinksDAO.find_all_in('short_URL', [codes[i] for i in pending])}
+            seen, retry = set(), []
+            for i in pending:
+                if codes[i] in taken or codes[i] in seen:
+                    retry.append(i)
+                else:
+                    seen.add(codes[i])
+            if not retry:
+                return codes
+            for i in retry:
+                codes[i] = short_url(original_URLs[i])
+            pending = retry
+        for i in pending:
+            codes[i] = None
+        return codes
+
+
+class CounterAllocator:
+    """
+    Коды из монотонного счётчика без проверки коллизий.
+    Процесс получает из последовательности БД номер блока (hi) и сам раздаёт
+    block_size идентификаторов внутри него (lo).
+    """
+
+    def __init__(self, block_size: int, permute: bool, key: str):
+        self.block_size = block_size
+        self.permute = permute
+        self.key = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        self._next_id = 0
+        self._block_end = 0
+        self._lock = asyncio.Lock()
+        self.blocks = 0
+
+    def encode(self, number: int) -> str:
+        if self.permute:
+            return base62_encode(permute_id(number, self.key), CODE_LENGTH)
+        return base62_encode(number)
+
+    async def next_id(self) -> int:
+        async with self._lock:
+            if self._next_id >= self._block_end:
+                hi = await LinksDAO.next_code_block()
+                self._next_id, self._block_end = hi * self.block_size, (hi + 1) * self.block_size
+                self.blocks += 1
+            number = self._next_id
+            self._next_id += 1
+            return number
+
+    async def allocate(self, original_URL: str) -> str:
+        return self.encode(await self.next_id())
+
+    async def allocate_many(self, original_URLs: list[str]) -> list[str]:
+        return [self.encode(await self.next_id()) for _ in original_URLs]
+
+    next_code = allocate
+
+
+class PoolAllocator:
+    """
+    Пул заранее сгенерированных и проверенных на уникальность кодов.
+    Общий резерв хранится в таблице reserved_codes, каждый процесс забирает
+    из неё пачку в свою очередь и выдаёт коды за O(1). Фоновая задача
+    держит очередь между low_watermark и high_watermark, а таблицу - на уровне reserve_size.
+    """
+
+    def __init__(self, low_watermark: int, high_watermark: int, reserve_size: int, code_length: int):
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.reserve_size = reserve_size
+        self.code_length = code_length
+        self._codes: deque[str] = deque()
+        self._refill_needed = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._fallback = HashAllocator(settings.SHORT_CODE_MAX_ATTEMPTS)
+        self.refills = 0
+        self.generated = 0
+        self.claimed = 0
+        self.fallbacks = 0
+
+    def generate(self, count: int) -> list[str]:
+        return [''.join(secrets.choice(BASE62_ALPHABET) for _ in range(self.code_length)) for _ in range(count)]
+
+    async def claim(self) -> int:
+        async with self._lock:
+            codes = await ReservedCodesDAO.claim(self.high_watermark - len(self._codes))
+            self._codes.extend(codes)
+            self.claimed += len(codes)
+            return len(codes)
+
+    async def refill(self):
+        missing = self.reserve_size - await ReservedCodesDAO.count()
+        if missing > 0:
+            self.generated += await ReservedCodesDAO.reserve(self.generate(missing))
+        if len(self._codes) < self.high_watermark:
+            await self.claim()
+        self.refills += 1
+
+    async def allocate(self, original_URL: str) -> str | None:
+        if len(self._codes) <= self.low_watermark:
+            self._refill_needed.set()
+        if not self._codes:
+            await self.claim()
+        if not self._codes:
+            # резерв пуст - не блокируем создание ссылки
+            self.fallbacks += 1
+            return await self._fallback.allocate(original_URL)
+        return self._codes.popleft()
+
+    async def allocate_many(self, original_URLs: list[str]) -> list[str | None]:
+        return [await self.allocate(url) for url in original_URLs]
+
+    next_code = allocate
+
+    async def run(self):
+        while True:
+            try:
+                await self.refill()
+            except Exception as e:
+                print(f"Ошибка пополнения пула коротких ссылок: {str(e)}")
+            self._refill_needed.clear()
+            try:
+                await asyncio.wait_for(self._refill_needed.wait(), timeout=60)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "available": len(self._codes),
+            "low_watermark": self.low_watermark,
+            "high_watermark": self.high_watermark,
+            "refills": self.refills,
+            "generated": self.generated,
+            "claimed": self.claimed,
+            "fallbacks": self.fallbacks,
+        }
+
+
+def make_allocator(name: str):
+    if name == 'hash':
+        return HashAllocator(settings.SHORT_CODE_MAX_ATTEMPTS)
+    if name == 'counter':
+        return CounterAllocator(settings.SHORT_CODE_BLOCK_SIZE, settings.SHORT_CODE_PERMUTE, settings.SECRET_KEY)
+    if name == 'pool':
+        return PoolAllocator(settings.SHORT_CODE_POOL_LOW, settings.SHORT_CODE_POOL_HIGH,
+                             settings.SHORT_CODE_POOL_RESERVE, settings.SHORT_CODE_POOL_CODE_LENGTH)
+    raise ValueError(f"Неизвестная стратегия коротких ссылок: {name}")
+
+
+short_code_allocator = make_allocator(settings.SHORT_CODE_ALLOCATOR)
@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import math
+
+from app.config import settings
+from app.database import primary_reads
+from app.links.dao import LinksDAO
+
+
+class CountingBloomFilter:
+    """
+    Считающий фильтр Блума: в отличие от обычного поддерживает удаление.
+    Ложноотрицательных ответов не бывает, ложноположительные - с вероятностью error_rate.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self._counters = bytearray(self.size)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            if self._counters[pos] < 255:
+                self._counters[pos] += 1
+        self.count += 1
+
+    def remove(self, key: str):
+        positions = self._positions(key)
+        if not all(self._counters[pos] for pos in positions):
+            return
+        for pos in positions:
+            # насыщенный счётчик не уменьшаем, иначе появятся ложноотрицательные ответы
+            if self._counters[pos] < 255:
+                self._counters[pos] -= 1
+        self.count -= 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._counters[pos] for pos in self._positions(key))
+
+
+class ShortCodeFilter:
+    """
+    Фильтр существующих коротких ссылок для отсечения заведомо несуществующих кодов без запроса в БД.
+    Фильтр свой в каждом процессе, изменения других процессов приходят через LISTEN/NOTIFY
+    (app.links.events). Пока фильтр не построен или подписка не работает (synced=False),
+    считается, что может существовать любой код.
+    """
+
+    def __init__(self, enabled: bool, capacity: int, error_rate: float, rebuild_interval: float):
+        self.enabled = enabled
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+        self._filter: CountingBloomFilter | None = None
+        self._changes_during_rebuild: list | None = None
+        self._rebuild_lock = asyncio.Lock()
+        # номер подписки на изменения: снимок, начатый до её обрыва, не устанавливается
+        self._generation = 0
+        self.synced = False
+        self.saved_queries = 0
+        self.rebuilds = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None
+
+    def might_contain(self, short_code: str) -> bool:
+        if not self.enabled or self._filter is None or not self.synced:
+            return True
+        if short_code in self._filter:
+            return True
+        self.saved_queries += 1
+        return False
+
+    def add(self, short_code: str):
+        if self._changes_during_rebuild is not None:
+            self._changes_during_rebuild.append((True, short_code))
+        if self._filter is not None:
+            self._filter.add(short_code)
+
+    def remove(self, short_code: str):
+        if self._changes_during_rebuild is not None:
+            self._changes_during_rebuild.append((False, short_code))
+        if self._filter is not None:
+            self._filter.remove(short_code)
+
+    def resync(self, synced: bool):
+        """
+        Подписка на изменения других процессов установлена или оборвалась: в обоих случаях
+        текущий фильтр мог пропустить изменения и больше не используется до перестройки.
+        """
+        self.invalidate()
+        self.synced = synced
+
+    def invalidate(self):
+        # фильтр устарел (например, после импорта): до перестройки пропускаем все коды
+        self._generation += 1
+        self._filter = None
+
+    async def rebuild(self):
+        async with self._rebuild_lock:
+            await self._rebuild()
+
+    async def _rebuild(self):
+        generation = self._generation
+        self._changes_during_rebuild = []
+        try:
+            new_filter = CountingBloomFilter(self.capacity, self.error_rate)
+            # отстающая реплика дала бы ложные "нет такого кода", поэтому читаем с основной БД
+            with primary_reads():
+                async for short_code in LinksDAO.iter_short_codes():
+                    new_filter.add(short_code)
+            # изменения, пришедшие во время чтения таблицы, применяем поверх снимка в исходном порядке
+            for added, short_code in self._changes_during_rebuild:
+                if added:
+                    new_filter.add(short_code)
+                else:
+                    new_filter.remove(short_code)
+        finally:
+            self._changes_during_rebuild = None
+        if generation != self._generation:
+            return
+        self._filter = new_filter
+        self.rebuilds += 1
+        if new_filter.count > self.capacity:
+            self.capacity = new_filter.count * 2
+
+    async def run(self):
+        """
+        Периодическая перестройка убирает накопившиеся ложноположительные коды (удалённые
+        целыми секциями, потерянные счётчики); первую строит подписка на изменения.
+        """
+        if not self.enabled:
+            return
+        while True:
+            await asyncio.sleep(self.rebuild_interval)
+            if not self.synced:
+                continue
+            try:
+                await self.rebuild()
+            except Exception as e:
+                print(f"Ошибка построения фильтра коротких ссылок: {str(e)}")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "synced": self.synced,
+            "items": self._filter.count if self._filter else 0,
+            "capacity": self.capacity,
+            "saved_queries": self.saved_queries,
+            "rebuilds": self.rebuilds,
+        }
+
+
+short_code_filter = ShortCodeFilter(
+    enabled=settings.LINK_FILTER_ENABLED,
+    capacity=settings.LINK_FILTER_CAPACITY,
+    error_rate=settings.LINK_FILTER_ERROR_RATE,
+    rebuild_interval=settings.LINK_FILTER_REBUILD_INTERVAL,
+)
@@ -0,0 +1,5 @@
+from app.cache import TTLCache
+from app.config import settings
+
+# short_URL -> (original_URL, expires_at) для горячего пути редиректа
+link_cache = TTLCache(maxsize=settings.LINK_CACHE_SIZE, ttl=settings.LINK_CACHE_TTL)
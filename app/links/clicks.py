@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+from app.config import settings
+from app.links.dao import LinksDAO
+
+
+class ClickBuffer:
+    """
+    Буфер переходов по коротким ссылкам (write-behind).
+    Переходы копятся в памяти по short_URL и сбрасываются в БД одним запросом
+    по таймеру, при достижении порога или при остановке приложения.
+    Размер буфера ограничен и при недоступной БД: после неудачного сброса следующие
+    попытки откладываются с растущей паузой, а переходы по новым кодам сверх лимита
+    отбрасываются и считаются в dropped_clicks.
+    """
+
+    def __init__(self, flush_interval: float, flush_threshold: int, max_pending: int, max_backoff: float = 60.0):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.max_pending = max_pending
+        self.max_backoff = max_backoff
+        self._pending: dict[str, int] = {}
+        self._lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+        self._failures_in_row = 0
+        self._retry_at = 0.0
+        self.flushes = 0
+        self.flushed_clicks = 0
+        self.failed_flushes = 0
+        self.dropped_clicks = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _can_flush(self) -> bool:
+        return time.monotonic() >= self._retry_at
+
+    def _merge(self, deltas: dict[str, int]):
+        for short_code, count in deltas.items():
+            if short_code in self._pending:
+                self._pending[short_code] += count
+            elif len(self._pending) < self.max_pending:
+                self._pending[short_code] = count
+            else:
+                self.dropped_clicks += count
+
+    async def add(self, short_code: str, count: int = 1):
+        if short_code not in self._pending and len(self._pending) >= self.max_pending and self._can_flush():
+            # буфер переполнен - пробуем сбросить, но не чаще, чем позволяет пауза после ошибок
+            await self.flush()
+        self._merge({short_code: count})
+
+        if (len(self._pending) >= self.flush_threshold and self._can_flush()
+                and (self._flush_task is None or self._flush_task.done())):
+            self._flush_task = asyncio.create_task(self.flush())
+
+    async def flush(self) -> int:
+        async with self._lock:
+            if not self._pending:
+                return 0
+            deltas, self._pending = self._pending, {}
+            try:
+                await LinksDAO.add_clicks(deltas)
+            except Exception as e:
+                self.failed_flushes += 1
+                self._failures_in_row += 1
+                self._retry_at = time.monotonic() + min(self.flush_interval * 2 ** self._failures_in_row, self.max_backoff)
+                print(f"Ошибка сброса переходов: {str(e)}")
+                # возвращаем переходы в буфер, новые накопленные не теряем
+                self._merge(deltas)
+                return 0
+            self._failures_in_row = 0
+            self._retry_at = 0.0
+            self.flushes += 1
+            self.flushed_clicks += sum(deltas.values())
+            return len(deltas)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self._can_flush():
+                await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "flushes": self.flushes,
+            "flushed_clicks": self.flushed_clicks,
+            "failed_flushes": self.failed_flushes,
+            "dropped_clicks": self.dropped_clicks,
+        }
+
+
+click_buffer = ClickBuffer(
+    flush_interval=settings.CLICK_FLUSH_INTERVAL,
+    flush_threshold=settings.CLICK_FLUSH_THRESHOLD,
+    max_pending=settings.CLICK_BUFFER_MAX_PENDING,
+    max_backoff=settings.CLICK_FLUSH_MAX_BACKOFF,
+)
@@ -1,6 +1,13 @@
 import hashlib
 import base64
 import random
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from app.config import settings
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+URL_DIGEST_SIZE = 16
+
 
 def short_url(long_url: str) -> str:
     hashed_url = hashlib.sha256(long_url.encode('utf-8')).digest()
@@ -9,5 +16,39 @@ def short_url(long_url: str) -> str:
     return ''.join(sorted(short_code, key=lambda x: random.random()))
 
 
+def canonical_url(long_url: str, sort_query: bool | None = None) -> str:
+    """
+    Каноническая форма URL: схема и хост в нижнем регистре, без порта по умолчанию,
+    пустой путь заменяется на "/", параметры запроса по желанию сортируются.
+    """
+    if sort_query is None:
+        sort_query = settings.URL_SORT_QUERY
+    parts = urlsplit(long_url.strip())
+    scheme = parts.scheme.lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if parts.hostname is None:
+        netloc = parts.netloc
+    else:
+        host = parts.hostname
+        if ':' in host:
+            host = f'[{host}]'
+        netloc = host
+        if port is not None and DEFAULT_PORTS.get(scheme) != port:
+            netloc = f'{host}:{port}'
+        if '@' in parts.netloc:
+            netloc = f"{parts.netloc.rsplit('@', 1)[0]}@{netloc}"
+    path = parts.path or ('/' if netloc else '')
+    query = parts.query
+    if sort_query and query:
+        query = urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, path, query, parts.fragment))
 
 
+def url_digest(long_url: str) -> bytes:
+    """
+    16 байт SHA-256 от канонической формы URL - ключ для поиска и дедупликации ссылок.
+    """
+    return hashlib.sha256(canonical_url(long_url).encode('utf-8')).digest()[:URL_DIGEST_SIZE]
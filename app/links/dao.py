@@ -1,11 +1,245 @@
-from sqlalchemy import update, event, delete
+from sqlalchemy import update, event, delete, values, column, table, String, Integer, or_, and_, func, text, exists, tuple_
 from sqlalchemy.future import select
 from sqlalchemy.orm import joinedload
+from sqlalchemy.dialects.postgresql import insert
 from app.dao.base import BaseDAO
-from app.links.models import Link
-from app.database import async_session_maker
+from app.links.models import Link, ReservedCode
+from app.links.coder import url_digest
+from app.database import session_scope
+
+
+DEFAULT_PARTITION = table('links_default', column('id'), column('short_URL'), column('expires_at'))
+
+# импорт ссылок: COPY во временную таблицу, затем перенос в links
+IMPORT_COLUMNS = ('original_URL', 'original_URL_hash', 'short_URL', 'clicks', 'expires_at', 'id_user')
+
+IMPORT_STAGING_TABLE = '''
+CREATE TEMP TABLE links_import (
+    line BIGSERIAL,
+    "original_URL" VARCHAR NOT NULL,
+    "original_URL_hash" BYTEA NOT NULL,
+    "short_URL" VARCHAR NOT NULL,
+    clicks INTEGER NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE,
+    id_user INTEGER
+) ON COMMIT DROP
+'''
+
+IMPORT_MERGE = '''
+WITH fresh AS (
+    SELECT DISTINCT ON ("original_URL_hash") *
+    FROM links_import s
+    WHERE NOT EXISTS (SELECT 1 FROM links l WHERE l."original_URL_hash" = s."original_URL_hash")
+    ORDER BY "original_URL_hash", line
+), inserted AS (
+    INSERT INTO links ("original_URL", "original_URL_hash", "short_URL", clicks, expires_at, is_registered, id_user)
+    SELECT "original_URL", "original_URL_hash", "short_URL", clicks, expires_at, id_user IS NOT NULL, id_user
+    FROM fresh
+    ORDER BY line
+    ON CONFLICT DO NOTHING
+    RETURNING 1
+)
+SELECT (SELECT count(*) FROM links_import), (SELECT count(*) FROM fresh), (SELECT count(*) FROM inserted)
+'''
 
 
 class LinksDAO(BaseDAO):
     model = Link
+    # links секционирована по сроку жизни: выставляется при запуске по фактической схеме
+    partitioned = False
+
+    @staticmethod
+    def _by_url_hash(filter_by: dict) -> dict:
+        """
+        Фильтр по original_URL идёт по индексу original_URL_hash и совпадает
+        с канонической формой URL, как в поиске.
+        """
+        if filter_by.get('original_URL') is None:
+            return filter_by
+        filter_by = dict(filter_by)
+        filter_by['original_URL_hash'] = url_digest(filter_by.pop('original_URL'))
+        return filter_by
+
+    @classmethod
+    def _select_by(cls, filter_by: dict, columns: tuple = ()):
+        return super()._select_by(cls._by_url_hash(filter_by), columns)
+
+    @classmethod
+    async def iter_all(cls, batch_size: int = 1000, **filter_by):
+        async for row in super().iter_all(batch_size, **cls._by_url_hash(filter_by)):
+            yield row
+
+    @classmethod
+    async def find_page(cls, limit: int, after_id: int | None = None, columns: tuple = (), **filter_by):
+        return await super().find_page(limit, after_id, columns, **cls._by_url_hash(filter_by))
+
+    @classmethod
+    async def find_row_by_url(cls, original_URL: str, columns: tuple):
+        return await cls.find_one_row(columns, original_URL_hash=url_digest(original_URL))
+
+    @classmethod
+    async def update(cls, filter_by, **values):
+        if 'original_URL' in values:
+            values['original_URL_hash'] = url_digest(values['original_URL'])
+        return await super().update(filter_by, **values)
+
+    @classmethod
+    def not_expired(cls):
+        return or_(cls.model.expires_at.is_(None), cls.model.expires_at > func.now())
+
+    @classmethod
+    async def delete_expired(cls, limit: int) -> list[str]:
+        """
+        Удаляет не больше limit протухших ссылок и возвращает их короткие коды.
+        """
+        # в секционированной таблице протухшие корзины удаляются DROP раздела,
+        # строками - только то, что лежит в разделе по умолчанию
+        links = DEFAULT_PARTITION if cls.partitioned else cls.model.__table__
+        ids = (
+            select(links.c.id)
+            .where(links.c.expires_at <= func.now())
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        query = delete(links).where(links.c.id.in_(ids)).returning(links.c.short_URL)
+        async with session_scope(write=True) as session:
+            result = await session.execute(query)
+            return list(result.scalars().all())
+
+    @classmethod
+    async def find_expiring(cls, start, end, after: tuple | None = None, limit: int = 1000):
+        """
+        Ссылки с expires_at в [start, end) по возрастанию (expires_at, id), начиная после ключа after.
+        """
+        query = (
+            select(cls.model.expires_at, cls.model.id, cls.model.short_URL)
+            .where(cls.model.expires_at >= start, cls.model.expires_at < end)
+            .order_by(cls.model.expires_at, cls.model.id)
+            .limit(limit)
+        )
+        if after is not None:
+            query = query.where(tuple_(cls.model.expires_at, cls.model.id) > tuple_(*after))
+        async with session_scope() as session:
+            result = await session.execute(query)
+            return result.all()
+
+    @classmethod
+    async def delete_expired_codes(cls, short_codes: list[str]) -> list[str]:
+        """
+        Удаляет перечисленные ссылки, если их срок действительно истёк.
+        """
+        if not short_codes:
+            return []
+        query = (
+            delete(cls.model)
+            .where(cls.model.short_URL.in_(short_codes), cls.model.expires_at <= func.now())
+            .returning(cls.model.short_URL)
+        )
+        async with session_scope(write=True) as session:
+            result = await session.execute(query)
+            return list(result.scalars().all())
+
+    @classmethod
+    async def next_code_block(cls) -> int:
+        """
+        Номер следующего блока идентификаторов для счётчика коротких ссылок.
+        """
+        async with session_scope(write=True, shared=False) as session:
+            result = await session.execute(text("SELECT nextval('link_code_hi_seq')"))
+            return result.scalar_one()
+
+    @classmethod
+    async def iter_short_codes(cls, batch_size: int = 10000):
+        async with session_scope(shared=False) as session:
+            result = await session.stream_scalars(
+                select(cls.model.short_URL).execution_options(yield_per=batch_size)
+            )
+            async for short_code in result:
+                yield short_code
+
+    @classmethod
+    async def add_clicks(cls, deltas: dict[str, int]) -> int:
+        """
+        Одним запросом UPDATE ... FROM (VALUES ...) прибавляет накопленные переходы.
+        """
+        rows = [{'short_URL': short_code, 'clicks': delta} for short_code, delta in deltas.items()]
+        # своя транзакция: сброс не должен откатываться вместе с запросом, который его запустил
+        return await cls.update_many('short_URL', rows, increment=('clicks',), shared=False)
+
+    @classmethod
+    async def notify(cls, channel: str, payloads: list[str]):
+        """
+        NOTIFY всех payloads одним запросом. Внутри общей сессии запроса уведомления
+        доставляются при COMMIT и пропадают при откате.
+        """
+        async with session_scope(write=True) as session:
+            await session.execute(
+                text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+                {"channel": channel, "payloads": payloads},
+            )
+
+    @classmethod
+    async def import_records(cls, records) -> dict:
+        """
+        Загружает записи (кортежи в порядке IMPORT_COLUMNS) через COPY во временную таблицу
+        и переносит в links одним INSERT ... ON CONFLICT DO NOTHING.
+        Записи может отдавать асинхронный генератор - в память целиком они не читаются.
+        """
+        async with session_scope(write=True, shared=False) as session:
+            # первый запрос идёт через сессию, чтобы COPY попал в уже открытую транзакцию
+            await session.execute(text(IMPORT_STAGING_TABLE))
+            connection = await session.connection()
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                'links_import', records=records, columns=IMPORT_COLUMNS
+            )
+            result = await session.execute(text(IMPORT_MERGE))
+            total, fresh, inserted = result.one()
+        return {
+            "inserted": inserted,
+            # такой URL уже есть в сервисе или встретился в файле раньше
+            "skipped": total - fresh,
+            # короткий код уже занят другой ссылкой
+            "conflicting": fresh - inserted,
+        }
+
+
+class ReservedCodesDAO(BaseDAO):
+    model = ReservedCode
+
+    @classmethod
+    async def count(cls) -> int:
+        async with session_scope() as session:
+            result = await session.execute(select(func.count()).select_from(cls.model))
+            return result.scalar_one()
+
+    @classmethod
+    async def reserve(cls, codes: list[str]) -> int:
+        """
+        Сохраняет коды, которых ещё нет ни среди ссылок, ни в резерве.
+        """
+        if not codes:
+            return 0
+        candidates = values(column('code', String), name='candidates').data([(code,) for code in codes])
+        query = (
+            insert(cls.model)
+            .from_select(['code'], select(candidates.c.code).where(~exists().where(Link.short_URL == candidates.c.code)))
+            .on_conflict_do_nothing(index_elements=['code'])
+        )
+        async with session_scope(write=True, shared=False) as session:
+            result = await session.execute(query)
+            return result.rowcount
 
+    @classmethod
+    async def claim(cls, limit: int) -> list[str]:
+        """
+        Забирает коды из резерва; SKIP LOCKED не даёт двум процессам получить один код.
+        """
+        if limit <= 0:
+            return []
+        ids = select(cls.model.id).limit(limit).with_for_update(skip_locked=True).scalar_subquery()
+        query = delete(cls.model).where(cls.model.id.in_(ids)).returning(cls.model.code)
+        async with session_scope(write=True, shared=False) as session:
+            result = await session.execute(query)
+            return list(result.scalars().all())
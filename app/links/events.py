@@ -0,0 +1,134 @@
+import asyncio
+import json
+from uuid import uuid4
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import direct_engine
+from app.links.bloom import short_code_filter
+from app.links.cache import link_cache
+from app.links.dao import LinksDAO
+
+CHANNEL = 'link_events'
+# payload NOTIFY ограничен 8000 байтами: коды (до 30 символов) отправляются пачками
+NOTIFY_CODES_CHUNK = 200
+# свои изменения процесс применяет сам, пришедшие обратно уведомления пропускает:
+# повторное добавление в счётный фильтр завысило бы счётчики
+ORIGIN = uuid4().hex
+
+
+def forget_links(short_codes: list[str]):
+    # удалённые ссылки убираем из кэша и фильтра
+    for short_code in short_codes:
+        link_cache.pop(short_code)
+        short_code_filter.remove(short_code)
+
+
+async def publish(op: str, short_codes: list[str] | None = None):
+    """
+    Рассылает изменение ссылок остальным процессам: add - коды созданы, remove - удалены,
+    invalidate - изменён URL (сбросить кэш), rebuild - кодов слишком много для уведомлений
+    (импорт), фильтр строится заново.
+    """
+    if short_codes is None:
+        payloads = [json.dumps({'origin': ORIGIN, 'op': op, 'codes': []})]
+    elif not short_codes:
+        return
+    else:
+        payloads = [
+            json.dumps({'origin': ORIGIN, 'op': op, 'codes': short_codes[i:i + NOTIFY_CODES_CHUNK]})
+            for i in range(0, len(short_codes), NOTIFY_CODES_CHUNK)
+        ]
+    await LinksDAO.notify(CHANNEL, payloads)
+
+
+async def rebuild_filter():
+    try:
+        await short_code_filter.rebuild()
+    except Exception as e:
+        print(f"Ошибка построения фильтра коротких ссылок: {str(e)}")
+
+
+async def links_added(short_codes: list[str]):
+    for short_code in short_codes:
+        short_code_filter.add(short_code)
+    await publish('add', short_codes)
+
+
+class LinkEvents:
+    """
+    Подписка на изменения ссылок из других процессов (LISTEN на отдельном соединении мимо пула).
+    Уведомления, отправленные во время обрыва, теряются, поэтому при каждом подключении
+    кэш ссылок очищается, а фильтр коротких кодов строится заново и до того не используется.
+    """
+
+    def __init__(self, ping_interval: float):
+        self.ping_interval = ping_interval
+        self.connected = False
+        self.received = 0
+        self.reconnects = 0
+
+    def apply(self, payload: str):
+        event = json.loads(payload)
+        if event['origin'] == ORIGIN:
+            return
+        self.received += 1
+        if event['op'] == 'add':
+            for short_code in event['codes']:
+                short_code_filter.add(short_code)
+        elif event['op'] == 'remove':
+            forget_links(event['codes'])
+        elif event['op'] == 'invalidate':
+            for short_code in event['codes']:
+                link_cache.pop(short_code)
+        elif event['op'] == 'rebuild' and short_code_filter.enabled:
+            short_code_filter.invalidate()
+            asyncio.create_task(rebuild_filter())
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            self.apply(payload)
+        except Exception as e:
+            print(f"Ошибка обработки уведомления об изменении ссылок: {str(e)}")
+
+    async def listen(self):
+        async with direct_engine.connect() as connection:
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.add_listener(CHANNEL, self._on_notify)
+            self.connected = True
+            # подписка уже действует: изменения во время чтения таблицы учтёт сама перестройка
+            short_code_filter.resync(True)
+            link_cache.clear()
+            if short_code_filter.enabled:
+                asyncio.create_task(rebuild_filter())
+            try:
+                while True:
+                    await asyncio.sleep(self.ping_interval)
+                    await asyncio.wait_for(connection.execute(select(1)), timeout=self.ping_interval)
+            finally:
+                self.connected = False
+                short_code_filter.resync(False)
+
+    async def run(self):
+        if direct_engine is None:
+            print("Подписка на изменения ссылок не запущена: при DB_PGBOUNCER нужен DB_DIRECT_URL, "
+                  "фильтр коротких ссылок не используется")
+            return
+        while True:
+            try:
+                await self.listen()
+            except Exception as e:
+                print(f"Подписка на изменения ссылок оборвалась: {str(e)}")
+            self.reconnects += 1
+            await asyncio.sleep(self.ping_interval)
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "received": self.received,
+            "reconnects": self.reconnects,
+        }
+
+
+link_events = LinkEvents(ping_interval=settings.LINK_EVENTS_PING_INTERVAL)
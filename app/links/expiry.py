@@ -0,0 +1,160 @@
+import asyncio
+import heapq
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.config import settings
+from app.links.dao import LinksDAO
+from app.links.events import forget_links, publish
+
+sweep_stats = {
+    "sweeps": 0,
+    "rows_swept": 0,
+    "last_sweep_rows": 0,
+    "last_sweep_seconds": 0.0,
+    "total_sweep_seconds": 0.0,
+}
+
+
+def is_expired(expires_at: datetime | None) -> bool:
+    if expires_at is None:
+        return False
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at <= datetime.now(timezone.utc)
+
+
+async def sweep_expired_links(chunk_size: int = None) -> int:
+    """
+    Удаляет протухшие ссылки пачками по chunk_size, отдавая управление циклу событий между пачками.
+    """
+    chunk_size = chunk_size or settings.EXPIRY_SWEEP_CHUNK
+    started = time.perf_counter()
+    deleted = 0
+    while True:
+        short_codes = await LinksDAO.delete_expired(chunk_size)
+        forget_links(short_codes)
+        await publish('remove', short_codes)
+        deleted += len(short_codes)
+        if len(short_codes) < chunk_size:
+            break
+        await asyncio.sleep(0)
+
+    elapsed = time.perf_counter() - started
+    sweep_stats["sweeps"] += 1
+    sweep_stats["rows_swept"] += deleted
+    sweep_stats["last_sweep_rows"] = deleted
+    sweep_stats["last_sweep_seconds"] = elapsed
+    sweep_stats["total_sweep_seconds"] += elapsed
+    return deleted
+
+
+class ExpiryScheduler:
+    """
+    Точное удаление ссылок в момент истечения срока.
+    Ближайшие истечения держатся в min-heap; из БД они подгружаются окнами
+    по horizon секунд, поэтому в памяти только ссылки, истекающие в ближайшее время.
+    Работает только у лидера: ссылки, созданные другими воркерами, подхватывает
+    пересканирование окна раз в rescan_interval секунд.
+    """
+
+    def __init__(self, horizon: float, batch_size: int, rescan_interval: float):
+        self.horizon = horizon
+        self.batch_size = batch_size
+        self.rescan_interval = rescan_interval
+        self._heap: list[tuple[float, str]] = []
+        # коды, уже лежащие в куче: повторное сканирование окна их не дублирует
+        self._scheduled: set[str] = set()
+        self._loaded_until: datetime | None = None
+        self._scanned_from: datetime | None = None
+        self._wakeup = asyncio.Event()
+        self.expired = 0
+        self.loaded = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._heap)
+
+    def _push(self, deadline: float, short_code: str):
+        if short_code in self._scheduled:
+            return
+        if not self._heap or deadline < self._heap[0][0]:
+            self._wakeup.set()
+        self._scheduled.add(short_code)
+        heapq.heappush(self._heap, (deadline, short_code))
+
+    def schedule(self, short_code: str, expires_at: datetime | None):
+        if expires_at is None:
+            return
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        # ссылки за пределами загруженного окна подхватит следующая загрузка
+        if self._loaded_until is None or expires_at >= self._loaded_until:
+            return
+        self._push(expires_at.timestamp(), short_code)
+
+    async def load(self):
+        now = datetime.now(timezone.utc)
+        # сканируем с момента прошлого сканирования: ссылки других воркеров, истёкшие
+        # между сканированиями, удаляются сразу; уже протухшие к первой загрузке - уборкой
+        start = self._scanned_from or now
+        end = now + timedelta(seconds=self.horizon)
+        after = None
+        while True:
+            rows = await LinksDAO.find_expiring(start, end, after=after, limit=self.batch_size)
+            for row in rows:
+                self._push(row.expires_at.timestamp(), row.short_URL)
+            self.loaded += len(rows)
+            if len(rows) < self.batch_size:
+                break
+            after = (rows[-1].expires_at, rows[-1].id)
+            await asyncio.sleep(0)
+        self._scanned_from = now
+        self._loaded_until = end
+
+    async def expire_due(self) -> int:
+        now = time.time()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[1])
+        if not due:
+            return 0
+        self._scheduled.difference_update(due)
+        deleted = await LinksDAO.delete_expired_codes(due)
+        # из фильтра убираем только реально удалённые коды: код, удалённый уборкой или
+        # продлённый, повторно декрементировал бы счётчики чужих ключей
+        forget_links(deleted)
+        await publish('remove', deleted)
+        self.expired += len(deleted)
+        return len(deleted)
+
+    async def run(self):
+        while True:
+            try:
+                await self.load()
+                await self.expire_due()
+            except Exception as e:
+                print(f"Ошибка планировщика удаления ссылок: {str(e)}")
+
+            timeout = self.rescan_interval
+            if self._heap:
+                timeout = min(timeout, max(self._heap[0][0] - time.time(), 0))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._heap),
+            "loaded": self.loaded,
+            "expired": self.expired,
+        }
+
+
+expiry_scheduler = ExpiryScheduler(
+    horizon=settings.EXPIRY_SCHEDULER_HORIZON,
+    batch_size=settings.EXPIRY_SCHEDULER_BATCH,
+    rescan_interval=settings.EXPIRY_SCHEDULER_RESCAN,
+)
@@ -0,0 +1,106 @@
+# импорт ссылок со старого сервиса: python -m app.links.importer links.csv [--format ndjson]
+import argparse
+import asyncio
+import csv
+import json
+from app.links.coder import url_digest
+from app.links.dao import LinksDAO
+from app.links.schemas import SLinkAdd
+
+READ_CHUNK_SIZE = 1 << 16
+
+
+def detect_format(filename: str | None) -> str:
+    if filename and filename.lower().endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return 'csv'
+
+
+async def read_lines(read, chunk_size: int = READ_CHUNK_SIZE):
+    """
+    Строки из источника, который отдаёт байты кусками через await read(size).
+    """
+    tail = b''
+    while chunk := await read(chunk_size):
+        lines = (tail + chunk).split(b'\n')
+        tail = lines.pop()
+        for line in lines:
+            yield line.decode('utf-8').rstrip('\r')
+    if tail:
+        yield tail.decode('utf-8').rstrip('\r')
+
+
+def to_record(item: dict) -> tuple:
+    """
+    Запись для COPY из строки файла. Строка проверяется той же схемой, что и ссылки,
+    созданные через API: иначе одна длинная или отрицательная запись ломала бы
+    выдачу, выгрузку и статистику на валидации ответа. Ошибки - ValueError.
+    """
+    id_user = item.get('id_user')
+    id_user = id_user if id_user not in (None, '') else None
+    link = SLinkAdd(
+        original_URL=item.get('original_URL') or '',
+        short_URL=item.get('short_URL') or '',
+        clicks=item.get('clicks') or 0,
+        expires_at=item.get('expires_at') or None,
+        is_registered=id_user is not None,
+        id_user=id_user,
+    )
+    return (
+        link.original_URL,
+        url_digest(link.original_URL),
+        link.short_URL,
+        link.clicks,
+        link.expires_at,
+        link.id_user,
+    )
+
+
+async def iter_records(lines, import_format: str, report: dict):
+    header = None
+    async for line in lines:
+        if not line.strip():
+            continue
+        try:
+            if import_format == 'csv':
+                fields = next(csv.reader([line]))
+                if header is None:
+                    header = fields
+                    continue
+                item = dict(zip(header, fields))
+            else:
+                item = json.loads(line)
+            yield to_record(item)
+        except (ValueError, TypeError, AttributeError):
+            report['invalid'] += 1
+
+
+async def import_links(read, import_format: str) -> dict:
+    """
+    Импортирует ссылки из источника байтов; возвращает число вставленных, пропущенных,
+    конфликтующих и некорректных строк.
+    """
+    report = {'invalid': 0}
+    result = await LinksDAO.import_records(iter_records(read_lines(read, READ_CHUNK_SIZE), import_format, report))
+    return {**result, **report}
+
+
+async def main(path: str, import_format: str | None = None):
+    from app.database import engine
+
+    with open(path, 'rb') as source:
+        async def read(size: int) -> bytes:
+            return source.read(size)
+
+        report = await import_links(read, import_format or detect_format(path))
+    await engine.dispose()
+    print(f"Импорт {path}: {report}")
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Импорт ссылок из CSV или NDJSON')
+    parser.add_argument('path', help='файл с колонками original_URL, short_URL, clicks, expires_at, id_user')
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default=None)
+    args = parser.parse_args()
+    asyncio.run(main(args.path, args.format))
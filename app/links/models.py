@@ -1,14 +1,25 @@
-from sqlalchemy import ForeignKey, text, Text
+from sqlalchemy import ForeignKey, text, Text, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from app.database import Base, str_uniq, int_pk, str_null_true
 from datetime import date, datetime
 from typing import Optional
-from sqlalchemy import Column, DateTime, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, DateTime, Integer, String, Boolean, ForeignKey, LargeBinary
+from app.links.coder import url_digest, URL_DIGEST_SIZE
 
 
 class Link(Base):
+    __table_args__ = (
+        # частичный индекс только по ссылкам со сроком жизни - для удаления протухших
+        Index('ix_links_expires_at', 'expires_at', postgresql_where=text('expires_at IS NOT NULL')),
+    )
+
     id: Mapped[int_pk]
-    original_URL: Mapped[str_uniq]
+    original_URL: Mapped[str]
+    # хэш канонической формы original_URL: по нему ищутся и дедуплицируются ссылки
+    original_URL_hash: Mapped[bytes] = mapped_column(
+        LargeBinary(URL_DIGEST_SIZE), unique=True, nullable=False,
+        default=lambda context: url_digest(context.get_current_parameters()['original_URL'])
+    )
     short_URL: Mapped[str_uniq]
     clicks: Mapped[int]                  # количество переходов
     #expires_at: Mapped[Optional[datetime]]   # время жизни ссылки
@@ -37,3 +48,13 @@ class Link(Base):
             "created_at": self.created_at,
             "updated_at": self.updated_at
         }
+
+
+class ReservedCode(Base):
+    __tablename__ = 'reserved_codes'
+
+    id: Mapped[int_pk]
+    code: Mapped[str_uniq]             # заранее проверенный свободный короткий код
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(code={self.code!r})"
@@ -0,0 +1,138 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import async_session_maker
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+PARTITION_PREFIX = 'links_p'
+DEFAULT_PARTITION = 'links_default'
+
+partition_stats = {
+    "runs": 0,
+    "created": 0,
+    "dropped": 0,
+    "rows_dropped": 0,
+    "last_run_seconds": 0.0,
+}
+
+
+def bucket_start(moment: datetime, days: int = None) -> datetime:
+    """
+    Начало корзины срока жизни, в которую попадает moment (корзины по days суток от начала эпохи).
+    """
+    days = days or settings.LINKS_PARTITION_DAYS
+    buckets = (moment - EPOCH) // timedelta(days=days)
+    return EPOCH + buckets * timedelta(days=days)
+
+
+def partition_name(start: datetime) -> str:
+    return f"{PARTITION_PREFIX}{start:%Y%m%d}"
+
+
+def partition_start(name: str) -> datetime:
+    return datetime.strptime(name[len(PARTITION_PREFIX):], '%Y%m%d').replace(tzinfo=timezone.utc)
+
+
+async def links_partitioned() -> bool:
+    """
+    Секционирована ли links на самом деле: флаг LINKS_PARTITIONED влияет только на миграцию.
+    """
+    async with async_session_maker() as session:
+        result = await session.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = 'links')"
+        ))
+        return result.scalar_one()
+
+
+async def list_partitions() -> list[str]:
+    async with async_session_maker() as session:
+        result = await session.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'links' AND c.relname LIKE :prefix"
+        ), {'prefix': f'{PARTITION_PREFIX}%'})
+        return sorted(result.scalars().all())
+
+
+async def create_partition(start: datetime, days: int = None):
+    """
+    Создаёт раздел корзины. Ссылки этой корзины, уже попавшие в раздел по умолчанию,
+    переносятся в новый раздел в той же транзакции, иначе ATTACH не пройдёт.
+    """
+    days = days or settings.LINKS_PARTITION_DAYS
+    end = start + timedelta(days=days)
+    name = partition_name(start)
+    async with async_session_maker() as session:
+        async with session.begin():
+            await session.execute(text(f'CREATE TABLE "{name}" (LIKE links INCLUDING DEFAULTS)'))
+            await session.execute(text(
+                f'WITH moved AS ('
+                f'  DELETE FROM "{DEFAULT_PARTITION}" WHERE expires_at >= :start AND expires_at < :end RETURNING *'
+                f') INSERT INTO "{name}" SELECT * FROM moved'
+            ), {'start': start, 'end': end})
+            await session.execute(text(
+                f"ALTER TABLE links ATTACH PARTITION \"{name}\" "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+
+
+async def drop_partition(name: str) -> int:
+    """
+    Отсоединяет и удаляет раздел целиком; возвращает оценку числа строк по pg_class.reltuples.
+    Коды по одному не читаются: кэш и так не отдаёт протухшие записи,
+    а из фильтра коротких ссылок они уйдут при следующей перестройке.
+    """
+    async with async_session_maker() as session:
+        async with session.begin():
+            result = await session.execute(
+                text("SELECT greatest(reltuples, 0)::bigint FROM pg_class WHERE relname = :name"), {'name': name}
+            )
+            rows = result.scalar_one()
+            await session.execute(text(f'ALTER TABLE links DETACH PARTITION "{name}"'))
+            await session.execute(text(f'DROP TABLE "{name}"'))
+    return rows
+
+
+async def maintain_partitions():
+    """
+    Создаёт разделы на LINKS_PARTITION_PREMAKE корзин вперёд и удаляет разделы,
+    все ссылки которых уже протухли.
+    """
+    if not await links_partitioned():
+        print("Таблица links не секционирована (миграция 0005 применена без LINKS_PARTITIONED), "
+              "обслуживание разделов пропущено")
+        return
+    started = time.perf_counter()
+    days = settings.LINKS_PARTITION_DAYS
+    now = datetime.now(timezone.utc)
+    existing = set(await list_partitions())
+
+    current = bucket_start(now, days)
+    for i in range(settings.LINKS_PARTITION_PREMAKE + 1):
+        start = current + timedelta(days=i * days)
+        if partition_name(start) not in existing:
+            await create_partition(start, days)
+            partition_stats["created"] += 1
+
+    for name in sorted(existing):
+        if partition_start(name) + timedelta(days=days) <= now:
+            partition_stats["rows_dropped"] += await drop_partition(name)
+            partition_stats["dropped"] += 1
+
+    partition_stats["runs"] += 1
+    partition_stats["last_run_seconds"] = time.perf_counter() - started
+
+
+async def run_partition_maintenance():
+    while True:
+        try:
+            await maintain_partitions()
+        except Exception as e:
+            print(f"Ошибка обслуживания разделов links: {str(e)}")
+        await asyncio.sleep(settings.LINKS_PARTITION_MAINTENANCE_INTERVAL)
@@ -1,15 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
-from fastapi.responses import RedirectResponse
+import base64
+import csv
+import io
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Response, Request, UploadFile
+from fastapi.responses import RedirectResponse, StreamingResponse
 from app.links.dao import LinksDAO
+from app.links.cache import link_cache
+from app.links.clicks import click_buffer
+from app.links.bloom import short_code_filter
+from app.links.events import forget_links, links_added, publish
+from app.links.expiry import expiry_scheduler, is_expired
 from app.links.rb import RBLink
-from app.links.schemas import SLink, SLinkAdd, SLinkURL, SLinkAddURLtime, SLinkShortURL, SLinkStat
-from app.links.coder import short_url
-from typing import Dict, Optional
+from app.links.schemas import SLink, SLinkAdd, SLinkURL, SLinkAddURLtime, SLinkShortURL, SLinkStat, SLinkBatchResult
+from app.links.allocator import short_code_allocator
+from app.links.coder import url_digest
+from app.links.importer import detect_format, import_links
+from typing import Dict, Literal, Optional
 from jose import jwt, JWTError
 from datetime import datetime, timezone
-from app.config import get_auth_data
-from app.users.dao import UsersDAO
+from app.config import get_auth_data, settings
+from app.users.auth import decode_token, get_user_by_id
+from app.database import after_commit, primary_reads, request_session
 from app.users.models import User
+from app.users.dependencies import get_current_admin_user as require_admin
 from fastapi.security import APIKeyCookie
 
 def get_token(request: Request):
@@ -26,8 +38,7 @@ async def get_current_user(token: Optional[str] = Depends(cookie_scheme)):
     if not token:
         return None
     try:
-        auth_data = get_auth_data()
-        payload = jwt.decode(token, auth_data['secret_key'], algorithms=auth_data['algorithm'])
+        payload = decode_token(token)
     except:
         return None
 
@@ -41,7 +52,7 @@ async def get_current_user(token: Optional[str] = Depends(cookie_scheme)):
     if not user_id:
         return None   #NoUserIdException
 
-    user = await UsersDAO.find_one_or_none_by_id(int(user_id))
+    user = await get_user_by_id(int(user_id))
     if not user:
         return None
     return user
@@ -57,17 +68,54 @@ async def get_current_admin_user(current_user: User = Depends(get_current_user))
 
 router = APIRouter(prefix='/links', tags=['API-сервис сокращения ссылок'])
 
+# колонки, которые читают обработчики только для чтения (без загрузки объектов ORM)
+REDIRECT_COLUMNS = ('original_URL', 'expires_at')
+SEARCH_COLUMNS = tuple(SLink.model_fields)
+STAT_COLUMNS = tuple(SLinkStat.model_fields)
+
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Некорректный курсор')
 
 
 @router.get("/", summary="Получить все зарегистрированные ссылки")
-async def get_all_links(request_body: RBLink = Depends()) -> list[SLink]:
+async def get_all_links(response: Response,
+                        request_body: RBLink = Depends(),
+                        cursor: Optional[str] = None,
+                        limit: int = Query(settings.LINKS_PAGE_SIZE, ge=1, le=settings.LINKS_PAGE_MAX),
+                        fields: Optional[str] = Query(None, description="Колонки через запятую, например short_URL,clicks")) -> list[dict]:
     """
-    Получить все зарегистрированные ссылки, сохранённые в базе данных.
+    Получить зарегистрированные ссылки постранично, по возрастанию id.
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor.
     """
-    return await LinksDAO.find_all(**request_body.to_dict())
+    after_id = decode_cursor(cursor) if cursor else None
+    if fields:
+        columns = tuple(dict.fromkeys(field.strip() for field in fields.split(',') if field.strip()))
+        unknown = set(columns) - set(SLink.model_fields)
+        if unknown:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"Неизвестные поля: {', '.join(sorted(unknown))}")
+        rows = await LinksDAO.find_page(limit, after_id, tuple(dict.fromkeys(('id',) + columns)), **request_body.to_dict())
+        links = [{column: getattr(row, column) for column in columns} for row in rows]
+        last_ids = [row.id for row in rows]
+    else:
+        rows = await LinksDAO.find_page(limit, after_id, **request_body.to_dict())
+        links = [SLink.model_validate(row).model_dump() for row in rows]
+        last_ids = [link['id'] for link in links]
+    if len(rows) == limit:
+        response.headers['X-Next-Cursor'] = encode_cursor(last_ids[-1])
+    return links
 
 
-@router.post("/shorten", summary="Сгенирировать короткую ссылку")
+@router.post("/shorten", summary="Сгенирировать короткую ссылку", dependencies=[Depends(request_session, scope="function")])
 async def add_link(link: SLinkAddURLtime, user_data: Optional[User] = Depends(get_current_user)) -> dict:
     """
     Пользователь отправляет запрос (POST /links/shorten) с длинной ссылкой.
@@ -80,26 +128,49 @@ async def add_link(link: SLinkAddURLtime, user_data: Optional[User] = Depends(ge
     Указание уникального alias (опционально):
     POST /links/shorten создается с параметром alias по желанию пользователя.
     """
-    check_url = await LinksDAO.find_one_or_none(original_URL = link.original_URL)
-
-    if check_url is not None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
-                                          detail=f'В сервисе уже есть короткая ссылка для {link.original_URL}')
+    if user_data:
+        is_registered = True
+        id_user = user_data.id
+    else:
+        is_registered = False
+        id_user = None
 
-    if link.alias:
-        if await LinksDAO.find_one_or_none(short_URL=link.alias):
+    # вставка сразу, без предварительных проверок: занятость URL и кода проверяет ON CONFLICT
+    digest = url_digest(link.original_URL)
+    for _ in range(settings.SHORT_CODE_MAX_ATTEMPTS):
+        short_URL = link.alias or await short_code_allocator.next_code(link.original_URL)
+        if short_URL is None:
+            break
+        new_link = SLinkAdd(**link.model_dump(), short_URL=short_URL, clicks=0, is_registered=is_registered, id_user=id_user)
+        instance, created = await LinksDAO.insert_or_get({'original_URL_hash': digest},
+                                                         **new_link.model_dump(), original_URL_hash=digest)
+        if created:
+            await links_added([short_URL])
+            expiry_scheduler.schedule(short_URL, new_link.expires_at)
+            return {"message": "Сcылка успешно добавлена!", "link": new_link}
+        if instance is not None:
+            # повторная отправка того же URL возвращает уже существующую короткую ссылку
+            return {"message": "Ссылка уже есть в сервисе!", "link": SLinkAdd.model_validate(instance)}
+        if link.alias:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f'Короткая ссылка {link.alias} уже используется в сервисе')
-        else:
-            short_URL=link.alias
-    else:
-        short_URL = short_url(link.original_URL)
-        counter = 0
-        while await LinksDAO.find_one_or_none(short_URL = short_URL):
-            short_URL = short_url(link.original_URL)
-            counter+=1
-            if counter == 2000:
-                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
-                                              detail=f'Сервис не может сгенерировать короткую ссылку для {link.original_URL}')
+
+    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                        detail=f'Сервис не может сгенерировать короткую ссылку для {link.original_URL}')
+
+
+
+
+@router.post("/shorten/batch", summary="Сгенерировать короткие ссылки пачкой", dependencies=[Depends(request_session, scope="function")])
+async def add_links_batch(links: list[SLinkAddURLtime], user_data: Optional[User] = Depends(get_current_user)) -> list[SLinkBatchResult]:
+    """
+    Массовое создание ссылок (POST /links/shorten/batch) одним запросом INSERT ... ON CONFLICT.
+    Результаты возвращаются в порядке запроса:
+    created - ссылка создана, existing - для URL уже есть короткая ссылка,
+    alias_taken - alias уже используется, conflict - ссылку создать не удалось.
+    """
+    if len(links) > settings.LINK_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f'В одном запросе можно передать не более {settings.LINK_BATCH_MAX_SIZE} ссылок')
 
     if user_data:
         is_registered = True
@@ -108,15 +179,64 @@ async def add_link(link: SLinkAddURLtime, user_data: Optional[User] = Depends(ge
         is_registered = False
         id_user = None
 
-    link = SLinkAdd(**link.model_dump(), short_URL = short_URL, clicks = 0, is_registered = is_registered, id_user = id_user)
-    #print(link)
-    check = await LinksDAO.add(**link.dict())
-    if check:
-        return {"message": "Сcылка успешно добавлена!", "link": link}
-    else:
-        return {"message": "Ошибка при добавлении ссылки!"}
+    # повторы URL (с точностью до канонической формы) внутри пачки создаём один раз
+    digests = [url_digest(link.original_URL) for link in links]
+    first: Dict[bytes, int] = {}
+    for i, digest in enumerate(digests):
+        first.setdefault(digest, i)
+    unique = list(first.values())
+
+    short_codes = {i: links[i].alias for i in unique if links[i].alias}
+    to_generate = [i for i in unique if not links[i].alias]
+    codes = await short_code_allocator.allocate_many([links[i].original_URL for i in to_generate])
+    short_codes.update(zip(to_generate, codes))
+
+    rows = [
+        SLinkAdd(**links[i].model_dump(), short_URL=short_codes[i], clicks=0,
+                 is_registered=is_registered, id_user=id_user).model_dump() | {'original_URL_hash': digests[i]}
+        for i in unique if short_codes[i] is not None
+    ]
+    created = {row.original_URL_hash: row.short_URL
+               for row in await LinksDAO.add_many(rows, returning=('original_URL_hash', 'short_URL'))}
+    missing = [digest for digest in first if digest not in created]
+    existing = {row.original_URL_hash: row.short_URL
+                for row in await LinksDAO.find_all_in('original_URL_hash', missing, ('original_URL_hash', 'short_URL'))}
+
+    await links_added(list(created.values()))
+    for i in unique:
+        if digests[i] in created:
+            expiry_scheduler.schedule(created[digests[i]], links[i].expires_at)
+
+    results = []
+    for i, link in enumerate(links):
+        digest = digests[i]
+        if digest in created:
+            result_status = 'created' if first[digest] == i else 'existing'
+            results.append(SLinkBatchResult(original_URL=link.original_URL, short_URL=created[digest], status=result_status))
+        elif digest in existing:
+            results.append(SLinkBatchResult(original_URL=link.original_URL, short_URL=existing[digest], status='existing'))
+        else:
+            result_status = 'alias_taken' if links[first[digest]].alias else 'conflict'
+            results.append(SLinkBatchResult(original_URL=link.original_URL, status=result_status))
+    return results
 
 
+@router.post("/import", summary="Импортировать ссылки из CSV или NDJSON")
+async def import_links_file(file: UploadFile,
+                            import_format: Optional[Literal['csv', 'ndjson']] = Query(None, alias='format'),
+                            admin: User = Depends(require_admin)) -> dict:
+    """
+    Перенос ссылок со старого сервиса (только для администратора).
+    Файл читается потоком и загружается через COPY, в ответе - число вставленных,
+    пропущенных (URL уже есть), конфликтующих (код занят) и некорректных строк.
+    """
+    report = await import_links(file.read, import_format or detect_format(file.filename))
+    if report['inserted'] and short_code_filter.enabled:
+        # до перестройки импортированные коды не должны получать 404 ни в одном процессе
+        short_code_filter.invalidate()
+        await publish('rebuild')
+        await short_code_filter.rebuild()
+    return report
 
 
 @router.get("/search", summary="Поиск ссылки по оригинальному URL")
@@ -126,7 +246,7 @@ async def search_link(url: str) -> SLink:
     GET /links/search?original_url={url}
     """
     original_URL=SLinkURL(original_URL=url).original_URL
-    link = await LinksDAO.find_one_or_none(original_URL=original_URL)
+    link = await LinksDAO.find_row_by_url(original_URL, SEARCH_COLUMNS)
     print(link)
 
     if link is None:
@@ -137,22 +257,79 @@ async def search_link(url: str) -> SLink:
 
 
 
+EXPORT_MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+async def export_rows(export_format: str, filters: dict):
+    columns = list(SLink.model_fields)
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+    async for link in LinksDAO.iter_all(settings.LINKS_EXPORT_BATCH, **filters):
+        row = SLink.model_validate(link)
+        if export_format == 'ndjson':
+            yield row.model_dump_json() + '\n'
+            continue
+        writer.writerow(row.model_dump(mode='json').values())
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if export_format == 'csv' and buffer.tell():
+        yield buffer.getvalue()
+
+
+@router.get("/export", summary="Выгрузить все ссылки потоком")
+async def export_links(request_body: RBLink = Depends(),
+                       export_format: Literal['ndjson', 'csv'] = Query('ndjson', alias='format')) -> StreamingResponse:
+    """
+    Выгрузка всех ссылок в NDJSON или CSV без загрузки таблицы в память.
+    """
+    return StreamingResponse(
+        export_rows(export_format, request_body.to_dict()),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename="links.{export_format}"'},
+    )
+
+
 @router.get("/{short_code}", summary="Воспользоваться короткой ссылкой")
 async def redirect_to_original_url(short_code: str):
     """
     При открытии короткой ссылки (GET-запрос к /{short_code}) сервис ищет в базе данных соответствующий оригинальный URL и перенаправляет пользователя (Redirect).
     """
     short_code = SLinkShortURL(short_URL=short_code).short_URL
-    link = await LinksDAO.find_one_or_none(short_URL=short_code)
-    if link is None:
+    if not short_code_filter.might_contain(short_code):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Короткая ссылка не найдена"
         )
 
-    value = link.clicks+1
-    await LinksDAO.update({'short_URL': short_code}, clicks=value)
-
-    return RedirectResponse(url=link.original_URL, status_code=status.HTTP_302_FOUND)
+    if settings.CLICK_MODE == 'strict':
+        row = await LinksDAO.increment({'short_URL': short_code}, 'clicks',
+                                       returning=('original_URL',), conditions=(LinksDAO.not_expired(),))
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Короткая ссылка не найдена"
+            )
+        return RedirectResponse(url=row.original_URL, status_code=status.HTTP_302_FOUND)
+
+    cached = link_cache.get(short_code)
+    if cached is None:
+        # кэш живёт дольше отставания реплики: заполняем его с основной БД, иначе после
+        # PUT отстающая реплика вернула бы в кэш старый URL
+        with primary_reads():
+            link = await LinksDAO.find_one_row(REDIRECT_COLUMNS, short_URL=short_code)
+        # протухшая ссылка не работает, даже если её ещё не удалили из БД
+        if link is None or is_expired(link.expires_at):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Короткая ссылка не найдена"
+            )
+        cached = (link.original_URL, link.expires_at)
+        link_cache.set(short_code, cached, expires_at=link.expires_at)
+
+    original_URL, _ = cached
+    await click_buffer.add(short_code)
+
+    return RedirectResponse(url=original_URL, status_code=status.HTTP_302_FOUND)
 
 """
 DELETE /links/{short_code} – удаляет связь.
@@ -162,7 +339,7 @@ DELETE /links/{short_code} – удаляет связь.
 Ссылки, созданные неавторизованными пользователями, могут быть изменены или удалены любым пользователем.
 """
 
-@router.delete("/{short_code}", summary="Удалить короткую ссылку")
+@router.delete("/{short_code}", summary="Удалить короткую ссылку", dependencies=[Depends(request_session, scope="function")])
 async def delete_url(short_code: str, user_data: Optional[User] = Depends(get_current_user)):
     """
     DELETE /links/{short_code} – удаляет связь.
@@ -191,16 +368,28 @@ async def delete_url(short_code: str, user_data: Optional[User] = Depends(get_cu
     if link_user_is_registered:
         if is_registered:
             if id_user == link_user:
-                await LinksDAO.delete(short_URL=short_code)
+                await delete_link(short_code)
         else:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Авторскую ссылку может удалить только ей автор!")
     else:
-        await LinksDAO.delete(short_URL=short_code)
+        await delete_link(short_code)
+
 
+async def delete_link(short_code: str):
+    # ссылку мог уже удалить параллельный запрос или уборка: повторное удаление кода
+    # из счётного фильтра Блума уменьшило бы счётчики живых ключей, поэтому без удалённой строки
+    # только сбрасываем кэш
+    if await LinksDAO.delete(short_URL=short_code):
+        # остальные процессы получат уведомление при COMMIT вместе с удалением
+        await publish('remove', [short_code])
+        after_commit(lambda: forget_links([short_code]))
+    else:
+        after_commit(lambda: link_cache.pop(short_code))
 
 
 
-@router.put("/{short_code}", summary="Заменить длинную ссылку по короткой ссылке")
+
+@router.put("/{short_code}", summary="Заменить длинную ссылку по короткой ссылке", dependencies=[Depends(request_session, scope="function")])
 async def update_url(short_code: str, url: SLinkURL, user_data: Optional[User] = Depends(get_current_user)):
     """
     PUT /links/{short_code} – обновляет URL (к короткой ссылке привязывается новая длинная ссылка).
@@ -229,11 +418,18 @@ async def update_url(short_code: str, url: SLinkURL, user_data: Optional[User] =
     if link_user_is_registered:
         if is_registered:
             if id_user == link_user:
-                await LinksDAO.update({'short_URL': short_code}, original_URL=original_URL)
+                await update_link(short_code, original_URL)
         else:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Авторскую ссылку может удалить только ей автор!")
     else:
-        await LinksDAO.update({'short_URL': short_code}, original_URL=original_URL)
+        await update_link(short_code, original_URL)
+
+
+async def update_link(short_code: str, original_URL: str):
+    await LinksDAO.update({'short_URL': short_code}, original_URL=original_URL)
+    # старый URL сбрасываем из кэша и у остальных процессов: уведомление уйдёт при COMMIT
+    await publish('invalidate', [short_code])
+    after_commit(lambda: link_cache.pop(short_code))
 
 
 
@@ -246,8 +442,10 @@ async def stat_url(short_code: str) -> SLinkStat:
     Отображает оригинальный URL, возвращает дату создания, количество переходов, дату последнего использования.
     """
     short_code = SLinkShortURL(short_URL=short_code).short_URL
-    link = await LinksDAO.find_one_or_none(short_URL=short_code)
-    if link is None:
+    link = None
+    if short_code_filter.might_contain(short_code):
+        link = await LinksDAO.find_one_row(STAT_COLUMNS, short_URL=short_code)
+    if link is None or is_expired(link.expires_at):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Короткая ссылка не найдена"
         )
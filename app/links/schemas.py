@@ -1,5 +1,5 @@
 from datetime import datetime, date, timezone
-from typing import Optional
+from typing import Literal, Optional
 import re
 from pydantic import BaseModel, Field, field_validator, EmailStr, ConfigDict
 
@@ -51,6 +51,12 @@ class SLinkAddURLtime(BaseModel):
     
 
 
+class SLinkBatchResult(BaseModel):
+    original_URL: str = Field(..., description="Длинная ссылка из запроса")
+    short_URL: Optional[str] = Field(None, description="Короткая ссылка, если она есть в сервисе")
+    status: Literal['created', 'existing', 'alias_taken', 'conflict'] = Field(..., description="Результат создания ссылки")
+
+
 class SLinkAdd(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     original_URL: str = Field(..., min_length=1, max_length=200, description="Длинная ссылка, от 1 до 200 символов")
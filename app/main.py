@@ -1,14 +1,27 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from app.users.router import router as router_users
 from app.links.router import router as router_links
-from datetime import datetime, timezone
 import asyncio
-from app.links.dao import LinksDAO
+from app.links.expiry import sweep_expired_links, sweep_stats, expiry_scheduler
+from app.links.clicks import click_buffer
+from app.links.bloom import short_code_filter
+from app.links.events import link_events
+from app.config import settings
+from app.leader import run_as_leader, release_all
+from app.links.allocator import short_code_allocator, PoolAllocator
 from sqlalchemy.exc import OperationalError
-from app.database import async_session_maker
+from app.database import async_session_maker, pool_stats, replica_set
+from app.metrics import MetricsMiddleware, render_metrics
+from app.links.cache import link_cache
+from app.users.cache import user_cache, token_cache
+from app.users.auth import password_hasher
+from app.links.partitions import links_partitioned, run_partition_maintenance, partition_stats
+from app.links.dao import LinksDAO
 from sqlalchemy import text
 
 app = FastAPI()
+app.add_middleware(MetricsMiddleware)
 
 async def wait_for_db():
     max_attempts = 10
@@ -27,38 +40,14 @@ async def wait_for_db():
 async def delete_expired_links():
     while True:
         try:
-            now = datetime.now(timezone.utc)
-            print(f"\n[Удаление ссылок] Текущее время (UTC): {now}")
-
-            links = await LinksDAO.find_all()
-            print(f"Найдено ссылок всего: {len(links)}")
-
-            expired_count = 0
-            for link in links:
-                if link.expires_at is not None:
-                    expires_at = (
-                        link.expires_at.replace(tzinfo=timezone.utc)
-                        if link.expires_at.tzinfo is None
-                        else link.expires_at.astimezone(timezone.utc)
-                    )
-
-                    print(f"Проверка ссылки {link.short_URL}: "
-                          f"expires_at={expires_at} (UTC)")
-
-                    if expires_at <= now:
-                        print(f"Ссылка {link.short_URL} протухла! Удаляем...")
-                        try:
-                            await LinksDAO.delete(short_URL=link.short_URL)
-                            expired_count += 1
-                            print(f"Успешно удалено!")
-                        except Exception as e:
-                            print(f"Ошибка удаления: {str(e)}")
-
-            print(f"Удалено просроченных ссылок: {expired_count}")
-            await asyncio.sleep(60)
+            deleted = await sweep_expired_links()
+            if deleted:
+                print(f"[Удаление ссылок] Удалено просроченных ссылок: {deleted} "
+                      f"за {sweep_stats['last_sweep_seconds']:.3f} с")
+            await asyncio.sleep(settings.EXPIRY_SWEEP_INTERVAL)
 
         except Exception as e:
-            print(f"КРИТИЧЕСКАЯ ОШИБКА: {str(e)}", exc_info=True)
+            print(f"КРИТИЧЕСКАЯ ОШИБКА: {str(e)}")
             await asyncio.sleep(10)
 
 
@@ -69,10 +58,63 @@ async def delete_expired_links():
 async def startup_event():
     try:
         await wait_for_db()
-        asyncio.create_task(delete_expired_links())
+        # удаление ссылок выполняет только один процесс во всём кластере
+        LinksDAO.partitioned = await links_partitioned()
+        if settings.LINKS_PARTITIONED and not LinksDAO.partitioned:
+            print("LINKS_PARTITIONED задан, но таблица links не секционирована - удаляем протухшие ссылки строками")
+        asyncio.create_task(run_as_leader('delete_expired_links', delete_expired_links))
+        if LinksDAO.partitioned:
+            # протухшие корзины удаляются целиком, до этого ссылки не отдаёт проверка при чтении
+            asyncio.create_task(run_as_leader('partition_maintenance', run_partition_maintenance))
+        else:
+            asyncio.create_task(run_as_leader('expiry_scheduler', expiry_scheduler.run))
+        asyncio.create_task(replica_set.run())
+        asyncio.create_task(click_buffer.run())
+        asyncio.create_task(link_events.run())
+        asyncio.create_task(short_code_filter.run())
+        if isinstance(short_code_allocator, PoolAllocator):
+            asyncio.create_task(short_code_allocator.run())
     except Exception as e:
         print(f"Ошибка при запуске: {e}")
         raise
 
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # накопленные переходы не должны потеряться при остановке
+    await click_buffer.flush()
+    await release_all()
+
+
+@app.get("/stats/pool", summary="Состояние пула соединений с БД")
+async def get_pool_stats() -> dict:
+    return {**pool_stats(), "replicas": replica_set.stats()}
+
+
+@app.get("/metrics", summary="Метрики в формате Prometheus", response_class=PlainTextResponse)
+async def get_metrics() -> str:
+    gauges = {
+        "db_pool": pool_stats(),
+        "db_replicas": {
+            "configured": len(replica_set.engines),
+            "healthy": sum(replica_set.healthy),
+            "primary_fallbacks": replica_set.primary_fallbacks,
+        },
+        "link_cache": link_cache.stats(),
+        "user_cache": user_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "click_buffer": click_buffer.stats(),
+        "short_code_filter": short_code_filter.stats(),
+        "link_events": link_events.stats(),
+        "expiry_sweep": sweep_stats,
+        "expiry_scheduler": expiry_scheduler.stats(),
+        "partitions": partition_stats,
+    }
+    if isinstance(short_code_allocator, PoolAllocator):
+        gauges["short_code_pool"] = short_code_allocator.stats()
+    return render_metrics(gauges)
+
+
 app.include_router(router_users)
 app.include_router(router_links)
\ No newline at end of file
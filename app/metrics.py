@@ -0,0 +1,178 @@
+import bisect
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+# границы корзин гистограмм задержки, в секундах
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in self.values.items():
+            lines.append(f"{self.name}{format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    Гистограмма в формате Prometheus: на наблюдение - bisect по корзинам и два сложения.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.counts: dict[tuple, list[int]] = {}
+        self.sums: dict[tuple, float] = {}
+
+    def observe(self, value: float, *labels):
+        counts = self.counts.get(labels)
+        if counts is None:
+            counts = self.counts[labels] = [0] * (len(self.buckets) + 1)
+            self.sums[labels] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sums[labels] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, counts in self.counts.items():
+            total = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                total += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{format_labels(self.labelnames, labels, le)} {total}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, labels)} {self.sums[labels]}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, labels)} {total}")
+        return lines
+
+
+http_request_duration = Histogram(
+    'http_request_duration_seconds', 'Время обработки HTTP-запроса', ('method', 'route'))
+http_requests_total = Counter(
+    'http_requests_total', 'Число HTTP-запросов по коду ответа', ('method', 'route', 'status'))
+dao_call_duration = Histogram(
+    'dao_call_duration_seconds', 'Время вызова метода DAO', ('dao', 'method'))
+dao_errors_total = Counter(
+    'dao_errors_total', 'Число вызовов DAO, завершившихся исключением', ('dao', 'method'))
+db_queries_total = Counter(
+    'db_queries_total', 'Число SQL-запросов по вызвавшему их методу DAO', ('dao', 'method'))
+
+REGISTRY = (http_request_duration, http_requests_total, dao_call_duration, dao_errors_total, db_queries_total)
+
+# метод DAO, который сейчас выполняется: к нему относятся SQL-запросы
+current_dao_call: ContextVar[tuple | None] = ContextVar('current_dao_call', default=None)
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: задержка и код ответа по шаблону маршрута (/links/{short_code}),
+    а не по фактическому пути - иначе число рядов метрик росло бы с числом ссылок.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get('route'), 'path', 'unmatched')
+            http_request_duration.observe(time.perf_counter() - started, scope['method'], route)
+            http_requests_total.inc(scope['method'], route, status_code)
+
+
+def timed_dao_method(func, method: str):
+    @functools.wraps(func)
+    async def wrapper(cls, *args, **kwargs):
+        # вложенные вызовы (find_row_by_url -> find_one_row) учитываются во внешнем
+        if current_dao_call.get() is not None:
+            return await func(cls, *args, **kwargs)
+        labels = (cls.__name__, method)
+        token = current_dao_call.set(labels)
+        started = time.perf_counter()
+        try:
+            return await func(cls, *args, **kwargs)
+        except Exception:
+            dao_errors_total.inc(*labels)
+            raise
+        finally:
+            dao_call_duration.observe(time.perf_counter() - started, *labels)
+            current_dao_call.reset(token)
+    return wrapper
+
+
+def observe_dao(cls):
+    """
+    Оборачивает асинхронные classmethod-ы DAO замером времени.
+    Потоковые генераторы (iter_all) не оборачиваются - их время зависит от потребителя.
+    """
+    for name, attr in list(vars(cls).items()):
+        if name.startswith('_') or not isinstance(attr, classmethod):
+            continue
+        if inspect.iscoroutinefunction(attr.__func__):
+            setattr(cls, name, classmethod(timed_dao_method(attr.__func__, name)))
+    return cls
+
+
+def count_queries(db_engine):
+    @event.listens_for(db_engine.sync_engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        db_queries_total.inc(*(current_dao_call.get() or ('none', 'none')))
+
+
+def render_metrics(gauges: dict[str, dict] | None = None) -> str:
+    """
+    Все метрики в текстовом формате Prometheus; gauges - словари stats() компонентов,
+    числовые значения выводятся как app_<группа>_<ключ>.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for group, stats in (gauges or {}).items():
+        for key, value in stats.items():
+            if isinstance(value, bool):
+                value = int(value)
+            if not isinstance(value, (int, float)):
+                continue
+            name = f"app_{group}_{key}"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,68 @@
+"""Hashed canonical original URL
+
+Revision ID: 0003_original_url_hash
+Revises: 0002_reserved_codes
+Create Date: 2026-10-18 10:20:00.000000
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.links.coder import url_digest, URL_DIGEST_SIZE
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003_original_url_hash'
+down_revision: Union[str, None] = '0002_reserved_codes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('links', sa.Column('original_URL_hash', sa.LargeBinary(URL_DIGEST_SIZE), nullable=True))
+
+    # заполняем хэш пачками по id, не загружая таблицу целиком
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.text('SELECT id, "original_URL" FROM links WHERE id > :last_id ORDER BY id LIMIT :limit'),
+            {'last_id': last_id, 'limit': BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            sa.text('UPDATE links SET "original_URL_hash" = :digest WHERE id = :id'),
+            [{'id': row.id, 'digest': url_digest(row.original_URL)} for row in rows],
+        )
+        last_id = rows[-1].id
+
+    # ссылки, совпавшие после канонизации с более старыми, получают хэш точного URL с префиксом,
+    # чтобы не нарушать уникальность и не потерять данные
+    duplicates = bind.execute(sa.text(
+        'SELECT id, "original_URL" FROM ('
+        '  SELECT id, "original_URL", row_number() OVER (PARTITION BY "original_URL_hash" ORDER BY id) AS n'
+        '  FROM links'
+        ') ranked WHERE n > 1'
+    )).all()
+    for row in duplicates:
+        digest = hashlib.sha256(b'\0' + row.original_URL.encode('utf-8')).digest()[:URL_DIGEST_SIZE]
+        bind.execute(sa.text('UPDATE links SET "original_URL_hash" = :digest WHERE id = :id'),
+                     {'id': row.id, 'digest': digest})
+
+    op.alter_column('links', 'original_URL_hash', nullable=False)
+    op.create_unique_constraint('links_original_URL_hash_key', 'links', ['original_URL_hash'])
+    op.drop_constraint('links_original_URL_key', 'links', type_='unique')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_unique_constraint('links_original_URL_key', 'links', ['original_URL'])
+    op.drop_constraint('links_original_URL_hash_key', 'links', type_='unique')
+    op.drop_column('links', 'original_URL_hash')
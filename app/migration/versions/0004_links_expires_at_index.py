@@ -0,0 +1,35 @@
+"""Partial index on links.expires_at
+
+Revision ID: 0004_links_expires_at_index
+Revises: 0003_original_url_hash
+Create Date: 2026-10-18 10:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004_links_expires_at_index'
+down_revision: Union[str, None] = '0003_original_url_hash'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не блокирует запись в links на время построения индекса
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_links_expires_at', 'links', ['expires_at'],
+            postgresql_where=sa.text('expires_at IS NOT NULL'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_links_expires_at', table_name='links', postgresql_concurrently=True)
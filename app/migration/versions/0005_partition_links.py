@@ -0,0 +1,129 @@
+"""Optional range partitioning of links by expires_at
+
+Таблица секционируется, только если при upgrade задан LINKS_PARTITIONED=true.
+Включить секционирование позже: LINKS_PARTITIONED=true alembic downgrade 0004_links_expires_at_index,
+затем alembic upgrade head (downgrade несекционированной таблицы ничего не делает).
+Приложение определяет схему по pg_partitioned_table, а не по флагу.
+
+Revision ID: 0005_partition_links
+Revises: 0004_links_expires_at_index
+Create Date: 2026-10-18 10:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005_partition_links'
+down_revision: Union[str, None] = '0004_links_expires_at_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONED_QUERY = (
+    "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+    "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = 'links')"
+)
+
+COLUMNS = ('id, "original_URL", "original_URL_hash", "short_URL", clicks, expires_at, '
+           'is_registered, id_user, created_at, updated_at')
+
+# уникальные индексы секционированной таблицы обязаны включать ключ секционирования,
+# поэтому уникальность short_URL и original_URL_hash по всей таблице держит триггер:
+# конфликтующая вставка тихо пропускается, как при ON CONFLICT DO NOTHING
+GUARD_FUNCTION = '''
+CREATE OR REPLACE FUNCTION links_unique_guard() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtextextended(NEW."short_URL", 0));
+    PERFORM pg_advisory_xact_lock(hashtextextended(encode(NEW."original_URL_hash", 'hex'), 1));
+    IF EXISTS (SELECT 1 FROM links WHERE "short_URL" = NEW."short_URL" AND id <> NEW.id)
+       OR EXISTS (SELECT 1 FROM links WHERE "original_URL_hash" = NEW."original_URL_hash" AND id <> NEW.id) THEN
+        IF TG_OP = 'INSERT' THEN
+            RETURN NULL;
+        END IF;
+        RAISE unique_violation USING MESSAGE = 'duplicate short_URL or original_URL_hash in links';
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+'''
+
+
+def links_partitioned() -> bool:
+    return op.get_bind().execute(sa.text(PARTITIONED_QUERY)).scalar()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not settings.LINKS_PARTITIONED or links_partitioned():
+        return
+
+    op.execute('ALTER TABLE links RENAME TO links_unpartitioned')
+    op.execute('ALTER SEQUENCE links_id_seq OWNED BY NONE')
+    op.execute('''
+        CREATE TABLE links (
+            id INTEGER NOT NULL DEFAULT nextval('links_id_seq'),
+            "original_URL" VARCHAR NOT NULL,
+            "original_URL_hash" BYTEA NOT NULL,
+            "short_URL" VARCHAR NOT NULL,
+            clicks INTEGER NOT NULL,
+            expires_at TIMESTAMP WITH TIME ZONE,
+            is_registered BOOLEAN NOT NULL,
+            id_user INTEGER,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+            updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now()
+        ) PARTITION BY RANGE (expires_at)
+    ''')
+    # бессрочные ссылки (NULL) и корзины, для которых ещё нет раздела, живут в разделе по умолчанию
+    op.execute('CREATE TABLE links_default PARTITION OF links DEFAULT')
+    op.execute(f'INSERT INTO links ({COLUMNS}) SELECT {COLUMNS} FROM links_unpartitioned')
+    op.execute('DROP TABLE links_unpartitioned')
+    op.execute('ALTER SEQUENCE links_id_seq OWNED BY links.id')
+
+    op.create_index('ix_links_id', 'links', ['id'])
+    op.create_index('ix_links_short_URL', 'links', ['short_URL'])
+    op.create_index('ix_links_original_URL_hash', 'links', ['original_URL_hash'])
+    op.create_index('ix_links_expires_at', 'links', ['expires_at'], postgresql_where=sa.text('expires_at IS NOT NULL'))
+
+    op.execute(GUARD_FUNCTION)
+    op.execute('''
+        CREATE TRIGGER links_unique_guard
+        BEFORE INSERT OR UPDATE OF "short_URL", "original_URL_hash" ON links
+        FOR EACH ROW EXECUTE FUNCTION links_unique_guard()
+    ''')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not links_partitioned():
+        return
+
+    op.execute('ALTER TABLE links RENAME TO links_partitioned')
+    op.execute('ALTER SEQUENCE links_id_seq OWNED BY NONE')
+    op.execute('''
+        CREATE TABLE links (
+            id INTEGER NOT NULL DEFAULT nextval('links_id_seq'),
+            "original_URL" VARCHAR NOT NULL,
+            "original_URL_hash" BYTEA NOT NULL,
+            "short_URL" VARCHAR NOT NULL,
+            clicks INTEGER NOT NULL,
+            expires_at TIMESTAMP WITH TIME ZONE,
+            is_registered BOOLEAN NOT NULL,
+            id_user INTEGER,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+            updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now()
+        )
+    ''')
+    op.execute(f'INSERT INTO links ({COLUMNS}) SELECT {COLUMNS} FROM links_partitioned')
+    op.execute('DROP TABLE links_partitioned CASCADE')
+    op.execute('DROP FUNCTION IF EXISTS links_unique_guard()')
+    op.execute('ALTER SEQUENCE links_id_seq OWNED BY links.id')
+
+    op.create_primary_key('links_pkey', 'links', ['id'])
+    op.create_unique_constraint('links_short_URL_key', 'links', ['short_URL'])
+    op.create_unique_constraint('links_original_URL_hash_key', 'links', ['original_URL_hash'])
+    op.create_index('ix_links_expires_at', 'links', ['expires_at'], postgresql_where=sa.text('expires_at IS NOT NULL'))
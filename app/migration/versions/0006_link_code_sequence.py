@@ -0,0 +1,28 @@
+"""Sequence for counter-based short code blocks
+
+Revision ID: 0006_link_code_sequence
+Revises: 0005_partition_links
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006_link_code_sequence'
+down_revision: Union[str, None] = '0005_partition_links'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # IF NOT EXISTS: раньше последовательность создавало само приложение при первом блоке
+    op.execute("CREATE SEQUENCE IF NOT EXISTS link_code_hi_seq MINVALUE 0 START 0")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP SEQUENCE IF EXISTS link_code_hi_seq")
@@ -1,9 +1,16 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 from pydantic import EmailStr
+from sqlalchemy import inspect as sa_inspect
 from jose import jwt
 from datetime import datetime, timedelta, timezone
-from app.config import get_auth_data
+from app.config import get_auth_data, settings
+from app.users.cache import token_cache, user_cache
 from app.users.dao import UsersDAO
+from app.users.models import User
 
 
 def create_access_token(data: dict) -> str:
@@ -15,7 +22,38 @@ def create_access_token(data: dict) -> str:
     return encode_jwt
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def decode_token(token: str) -> dict:
+    """
+    Claims токена; подпись проверяется только при первой встрече токена. Ошибки - JWTError.
+    """
+    claims = token_cache.get(token)
+    if claims is None:
+        auth_data = get_auth_data()
+        claims = jwt.decode(token, auth_data['secret_key'], algorithms=auth_data['algorithm'])
+        expire = claims.get('exp')
+        if expire:
+            token_cache.set(token, claims, expires_at=datetime.fromtimestamp(int(expire), tz=timezone.utc))
+    return claims
+
+
+def detached_copy(user: User) -> User:
+    # кэш переживает сессию, из которой загружен пользователь: откат общей сессии запроса
+    # просрочил бы атрибуты живого ORM-объекта, и следующие запросы получали бы DetachedInstanceError
+    loaded = sa_inspect(user).dict
+    return User(**{attr.key: loaded[attr.key] for attr in sa_inspect(User).column_attrs if attr.key in loaded})
+
+
+async def get_user_by_id(user_id: int):
+    user = user_cache.get(user_id)
+    if user is None:
+        user = await UsersDAO.find_one_or_none_by_id(user_id)
+        if user is not None:
+            user = detached_copy(user)
+            user_cache.set(user_id, user)
+    return user
+
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 
 def get_password_hash(password: str) -> str:
@@ -26,8 +64,54 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+class PasswordHasher:
+    """
+    bcrypt в отдельном пуле потоков, чтобы не блокировать цикл событий (bcrypt отпускает GIL).
+    Очередь ограничена: при max_pending ожидающих вызовах новые получают 503.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail='Сервис перегружен, повторите попытку позже',
+                                headers={'Retry-After': '1'})
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+password_hasher = PasswordHasher(workers=settings.BCRYPT_WORKERS, max_pending=settings.BCRYPT_MAX_PENDING)
+
+
 async def authenticate_user(email: EmailStr, password: str):
     user = await UsersDAO.find_one_or_none(email=email)
-    if not user or verify_password(plain_password=password, hashed_password=user.password) is False:
+    if not user or await password_hasher.verify(password, user.password) is False:
         return None
     return user
@@ -0,0 +1,8 @@
+from app.cache import TTLCache
+from app.config import settings
+
+# id -> User для get_current_user: без запроса в БД на каждый запрос с авторизацией
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+
+# JWT -> claims уже проверенного токена: подпись не проверяется повторно, запись живёт не дольше exp
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL)
@@ -1,6 +1,47 @@
-from app.dao.base import BaseDAO
+from app.dao.base import BaseDAO, DELETE_MANY_CHUNK
+from app.users.cache import user_cache
 from app.users.models import User
 
 
 class UsersDAO(BaseDAO):
     model = User
+
+    @classmethod
+    def forget(cls, filter_by: dict):
+        # по id сбрасываем одну запись, по другим полям неизвестно, кого задело, - весь кэш
+        if set(filter_by) == {'id'}:
+            user_cache.pop(filter_by['id'])
+        else:
+            user_cache.clear()
+
+    @classmethod
+    async def update(cls, filter_by, **values):
+        result = await super().update(filter_by, **values)
+        cls.forget(filter_by)
+        return result
+
+    @classmethod
+    async def delete(cls, delete_all: bool = False, **filter_by):
+        result = await super().delete(delete_all, **filter_by)
+        cls.forget(filter_by)
+        return result
+
+    @classmethod
+    async def update_many(cls, key: str, rows: list[dict], increment: tuple = (), shared: bool = True) -> int:
+        result = await super().update_many(key, rows, increment, shared)
+        if key == 'id':
+            for row in rows:
+                user_cache.pop(row['id'])
+        else:
+            user_cache.clear()
+        return result
+
+    @classmethod
+    async def delete_many(cls, key: str, keys: list, conditions: tuple = (), chunk_size: int = DELETE_MANY_CHUNK) -> int:
+        result = await super().delete_many(key, keys, conditions, chunk_size)
+        if key == 'id' and not conditions:
+            for user_id in keys:
+                user_cache.pop(user_id)
+        else:
+            user_cache.clear()
+        return result
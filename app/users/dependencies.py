@@ -1,8 +1,7 @@
 from fastapi import Request, HTTPException, status, Depends
 from jose import jwt, JWTError
 from datetime import datetime, timezone
-from app.config import get_auth_data
-from app.users.dao import UsersDAO
+from app.users.auth import decode_token, get_user_by_id
 from app.users.models import User
 from fastapi.security import APIKeyCookie
 
@@ -16,8 +15,7 @@ cookie_scheme = APIKeyCookie(name="users_access_token", auto_error=True)
 
 async def get_current_user(token: str = Depends(cookie_scheme)):
     try:
-        auth_data = get_auth_data()
-        payload = jwt.decode(token, auth_data['secret_key'], algorithms=auth_data['algorithm'])
+        payload = decode_token(token)
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Токен не валидный!')  #NoJwtException
 
@@ -30,7 +28,7 @@ async def get_current_user(token: str = Depends(cookie_scheme)):
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Не найден ID пользователя') #NoUserIdException
 
-    user = await UsersDAO.find_one_or_none_by_id(int(user_id))
+    user = await get_user_by_id(int(user_id))
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='User not found')
     return user
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Response, Depends
 
 
-from app.users.auth import get_password_hash, authenticate_user, create_access_token
+from app.users.auth import password_hasher, authenticate_user, create_access_token
 from app.users.dao import UsersDAO
 from app.users.dependencies import get_current_user, get_current_admin_user
 from app.users.models import User
@@ -16,7 +16,7 @@ async def register_user(user_data: SUserRegister) -> dict:
     if user:
         raise Exception("Существует пользователь с таким именем")
     user_dict = user_data.dict()
-    user_dict['password'] = get_password_hash(user_data.password)
+    user_dict['password'] = await password_hasher.hash(user_data.password)
     await UsersDAO.add(**user_dict)
     return {'message': f'Вы успешно зарегистрированы!'}
 
@@ -0,0 +1,64 @@
+# Стоимость bcrypt по числу раундов и задержка цикла событий при хэшировании в нём и в пуле потоков.
+# Запуск: python -m benchmarks.bcrypt_rounds
+import asyncio
+import time
+
+from passlib.context import CryptContext
+
+from app.users.auth import PasswordHasher
+
+ROUNDS = (8, 10, 11, 12, 13)
+CONCURRENT = 8
+
+
+def hash_cost(rounds: int) -> float:
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+    started = time.perf_counter()
+    context.hash("benchmark-password")
+    return time.perf_counter() - started
+
+
+async def max_loop_lag(work) -> float:
+    """
+    Наибольшая задержка тика цикла событий (шаг 1 мс), пока выполняется work.
+    """
+    lag = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal lag
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lag = max(lag, time.perf_counter() - started - 0.001)
+
+    tick = asyncio.create_task(ticker())
+    await work()
+    done.set()
+    await tick
+    return lag
+
+
+async def main():
+    hash_cost(4)  # прогрев: загрузка бэкенда bcrypt в passlib
+    for rounds in ROUNDS:
+        print(f"rounds={rounds:<3} {hash_cost(rounds) * 1000:8.1f} мс на хэш")
+
+    from app.users import auth
+
+    async def inline():
+        for _ in range(CONCURRENT):
+            auth.get_password_hash("benchmark-password")
+            await asyncio.sleep(0.001)
+
+    hasher = PasswordHasher(workers=2, max_pending=CONCURRENT)
+
+    async def offloaded():
+        await asyncio.gather(*[hasher.hash("benchmark-password") for _ in range(CONCURRENT)])
+
+    print(f"{CONCURRENT} хэшей в цикле событий: задержка цикла до {await max_loop_lag(inline) * 1000:.1f} мс")
+    print(f"{CONCURRENT} хэшей в пуле потоков:  задержка цикла до {await max_loop_lag(offloaded) * 1000:.1f} мс")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,52 @@
+# Накладные расходы на построение SELECT в BaseDAO: заново на каждый вызов и из кэша _select_by.
+# Запуск: python -m benchmarks.dao_statements
+import timeit
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.dao.base import BaseDAO
+from app.links.models import Link
+
+N = 20000
+
+
+class BenchLinksDAO(BaseDAO):
+    model = Link
+
+
+def build_each_time(short_code):
+    query = select(Link).filter_by(short_URL=short_code)
+    # ключ кэша компиляции SQLAlchemy считает при каждом execute
+    query._generate_cache_key()
+    return query, {}
+
+
+def build_cached(short_code):
+    query, params = BenchLinksDAO._select_by({'short_URL': short_code})
+    query._generate_cache_key()
+    return query, params
+
+
+def report(title, seconds):
+    print(f"{title:<45} {seconds / N * 1e6:8.1f} мкс/вызов")
+
+
+def main():
+    report("построение заново", timeit.timeit(lambda: build_each_time('abc123'), number=N))
+    report("из кэша _select_by", timeit.timeit(lambda: build_cached('abc123'), number=N))
+
+    # полный путь с выполнением на SQLite в памяти, чтобы оценить долю от всего вызова
+    engine = create_engine('sqlite://')
+    Link.__table__.create(engine)
+    with Session(engine) as session:
+        for title, build in (("выполнение, построение заново", build_each_time),
+                             ("выполнение, из кэша _select_by", build_cached)):
+            def call():
+                query, params = build('abc123')
+                session.execute(query, params).scalar_one_or_none()
+            report(title, timeit.timeit(call, number=N))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import pytest
+from unittest.mock import AsyncMock
+
+from app.links.allocator import base62_encode, permute_id, CounterAllocator, PoolAllocator, CODE_LENGTH
+
+
+def test_base62_encode():
+    assert base62_encode(0) == "0"
+    assert base62_encode(61) == "Z"
+    assert base62_encode(62) == "10"
+    assert base62_encode(5, length=3) == "005"
+
+
+def test_permute_id_is_bijective():
+    key = b"secret"
+    numbers = range(10000)
+    permuted = {permute_id(n, key) for n in numbers}
+    assert len(permuted) == len(numbers)
+    assert all(p < 1 << 40 for p in permuted)
+
+
+def test_permute_id_out_of_range():
+    with pytest.raises(ValueError):
+        permute_id(1 << 40, b"secret")
+
+
+@pytest.mark.asyncio
+async def test_counter_allocator_uses_blocks(monkeypatch):
+    next_block = AsyncMock(side_effect=[0, 7])
+    monkeypatch.setattr("app.links.dao.LinksDAO.next_code_block", next_block)
+    allocator = CounterAllocator(block_size=2, permute=False, key="secret")
+
+    ids = [await allocator.next_id() for _ in range(4)]
+    assert ids == [0, 1, 14, 15]
+    assert next_block.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_counter_allocator_permuted_codes(monkeypatch):
+    monkeypatch.setattr("app.links.dao.LinksDAO.next_code_block", AsyncMock(return_value=0))
+    allocator = CounterAllocator(block_size=100, permute=True, key="secret")
+
+    codes = [await allocator.allocate("https://example.com") for _ in range(100)]
+    assert len(set(codes)) == 100
+    assert all(len(code) == CODE_LENGTH for code in codes)
+
+
+@pytest.mark.asyncio
+async def test_pool_allocator_pops_claimed_codes(monkeypatch):
+    claim = AsyncMock(return_value=["aaaa", "bbbb", "cccc"])
+    monkeypatch.setattr("app.links.dao.ReservedCodesDAO.claim", claim)
+    allocator = PoolAllocator(low_watermark=1, high_watermark=3, reserve_size=10, code_length=4)
+
+    assert await allocator.allocate("https://example.com") == "aaaa"
+    assert await allocator.allocate("https://example.com") == "bbbb"
+    claim.assert_awaited_once_with(3)
+    assert allocator._refill_needed.is_set()
+
+
+@pytest.mark.asyncio
+async def test_pool_allocator_refill(monkeypatch):
+    monkeypatch.setattr("app.links.dao.ReservedCodesDAO.count", AsyncMock(return_value=7))
+    reserve = AsyncMock(return_value=3)
+    monkeypatch.setattr("app.links.dao.ReservedCodesDAO.reserve", reserve)
+    monkeypatch.setattr("app.links.dao.ReservedCodesDAO.claim", AsyncMock(return_value=["aaaa", "bbbb"]))
+    allocator = PoolAllocator(low_watermark=1, high_watermark=2, reserve_size=10, code_length=4)
+
+    await allocator.refill()
+    assert len(reserve.await_args.args[0]) == 3
+    assert allocator.stats()["available"] == 2
+    assert allocator.generated == 3
+
+
+@pytest.mark.asyncio
+async def test_pool_allocator_falls_back_when_empty(monkeypatch):
+    monkeypatch.setattr("app.links.dao.ReservedCodesDAO.claim", AsyncMock(return_value=[]))
+    monkeypatch.setattr("app.links.dao.LinksDAO.find_one_or_none", AsyncMock(return_value=None))
+    allocator = PoolAllocator(low_watermark=1, high_watermark=2, reserve_size=10, code_length=4)
+
+    assert await allocator.allocate("https://example.com")
+    assert allocator.fallbacks == 1
@@ -0,0 +1,42 @@
+from collections import namedtuple
+from unittest.mock import AsyncMock
+
+from app.links.coder import url_digest
+
+Row = namedtuple("Row", ["original_URL_hash", "short_URL"])
+
+
+def test_batch_shorten_results_in_input_order(client, monkeypatch):
+    monkeypatch.setattr("app.links.dao.LinksDAO.notify", AsyncMock())
+    monkeypatch.setattr("app.links.allocator.short_code_allocator.allocate_many",
+                        AsyncMock(side_effect=lambda urls: [f"gen{i}" for i in range(len(urls))]))
+    add_many = AsyncMock(return_value=[Row(url_digest("https://a.com"), "gen0"), Row(url_digest("https://b.com"), "mine")])
+    monkeypatch.setattr("app.links.dao.LinksDAO.add_many", add_many)
+    monkeypatch.setattr("app.links.dao.LinksDAO.find_all_in",
+                        AsyncMock(return_value=[Row(url_digest("https://c.com"), "old")]))
+
+    response = client.post("/links/shorten/batch", json=[
+        {"original_URL": "https://a.com"},
+        {"original_URL": "https://b.com", "alias": "mine"},
+        {"original_URL": "https://c.com"},
+        {"original_URL": "https://d.com", "alias": "taken"},
+        {"original_URL": "HTTPS://A.com:443/"},
+    ])
+    assert response.status_code == 200
+    assert [(r["short_URL"], r["status"]) for r in response.json()] == [
+        ("gen0", "created"),
+        ("mine", "created"),
+        ("old", "existing"),
+        (None, "alias_taken"),
+        ("gen0", "existing"),
+    ]
+    assert len(add_many.await_args.args[0]) == 4
+
+
+def test_batch_shorten_size_limit(client, monkeypatch):
+    monkeypatch.setattr("app.config.settings.LINK_BATCH_MAX_SIZE", 1)
+    response = client.post("/links/shorten/batch", json=[
+        {"original_URL": "https://a.com"},
+        {"original_URL": "https://b.com"},
+    ])
+    assert response.status_code == 413
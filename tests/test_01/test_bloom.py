@@ -0,0 +1,55 @@
+import pytest
+
+from app.links.bloom import CountingBloomFilter, ShortCodeFilter
+
+
+def test_bloom_has_no_false_negatives():
+    bloom = CountingBloomFilter(capacity=1000, error_rate=0.01)
+    codes = [f"code{i}" for i in range(1000)]
+    for code in codes:
+        bloom.add(code)
+    assert all(code in bloom for code in codes)
+
+
+def test_bloom_false_positive_rate():
+    bloom = CountingBloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"code{i}")
+    false_positives = sum(f"missing{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_bloom_remove():
+    bloom = CountingBloomFilter(capacity=100, error_rate=0.01)
+    bloom.add("abc")
+    bloom.add("def")
+    bloom.remove("abc")
+    assert "abc" not in bloom
+    assert "def" in bloom
+
+
+def test_filter_allows_everything_until_built():
+    short_filter = ShortCodeFilter(enabled=True, capacity=100, error_rate=0.01, rebuild_interval=60)
+    assert short_filter.might_contain("abc")
+    assert short_filter.saved_queries == 0
+
+
+@pytest.mark.asyncio
+async def test_filter_rebuild_and_saved_queries(monkeypatch):
+    async def iter_short_codes():
+        for code in ("abc", "def"):
+            yield code
+
+    monkeypatch.setattr("app.links.dao.LinksDAO.iter_short_codes", iter_short_codes)
+    short_filter = ShortCodeFilter(enabled=True, capacity=100, error_rate=0.01, rebuild_interval=60)
+    short_filter.resync(True)
+    await short_filter.rebuild()
+
+    assert short_filter.might_contain("abc")
+    assert not short_filter.might_contain("zzz")
+    assert short_filter.saved_queries == 1
+
+    short_filter.add("zzz")
+    assert short_filter.might_contain("zzz")
+    short_filter.remove("abc")
+    assert not short_filter.might_contain("abc")
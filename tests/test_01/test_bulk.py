@@ -0,0 +1,56 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.database import current_session
+from app.links.dao import LinksDAO
+from app.users.dao import UsersDAO
+
+
+def request_session(rowcount):
+    session = MagicMock()
+    result = MagicMock()
+    result.rowcount = rowcount
+    session.execute = AsyncMock(return_value=result)
+    return session
+
+
+@pytest.mark.asyncio
+async def test_update_many_single_statement_from_values():
+    session = request_session(rowcount=2)
+    token = current_session.set(session)
+    try:
+        updated = await LinksDAO.update_many(
+            "short_URL", [{"short_URL": "abc", "clicks": 2}, {"short_URL": "def", "clicks": 5}], increment=("clicks",)
+        )
+    finally:
+        current_session.reset(token)
+
+    assert updated == 2
+    session.execute.assert_awaited_once()
+    sql = str(session.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "FROM (VALUES" in sql
+    assert "clicks=(links.clicks + new_values.clicks)" in sql
+    assert 'links."short_URL" = new_values."short_URL"' in sql
+
+
+@pytest.mark.asyncio
+async def test_delete_many_chunks_keys_into_any():
+    session = request_session(rowcount=2)
+    token = current_session.set(session)
+    try:
+        deleted = await UsersDAO.delete_many("id", [1, 2, 3, 4, 5], chunk_size=2)
+    finally:
+        current_session.reset(token)
+
+    assert deleted == 6
+    calls = session.execute.await_args_list
+    assert [call.args[1] for call in calls] == [{"keys": [1, 2]}, {"keys": [3, 4]}, {"keys": [5]}]
+    assert "users.id = ANY (%(keys)s::INTEGER[])" in str(calls[0].args[0].compile(dialect=postgresql.dialect()))
+
+
+@pytest.mark.asyncio
+async def test_bulk_helpers_skip_empty_input():
+    assert await LinksDAO.update_many("short_URL", []) == 0
+    assert await LinksDAO.delete_many("short_URL", []) == 0
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+
+from app.cache import TTLCache
+
+
+def test_cache_hit_and_miss():
+    cache = TTLCache(maxsize=10, ttl=60)
+    assert cache.get("abc") is None
+    cache.set("abc", ("https://example.com", None))
+    assert cache.get("abc") == ("https://example.com", None)
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_cache_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.evictions == 1
+
+
+def test_cache_ttl_expiration(monkeypatch):
+    cache = TTLCache(maxsize=10, ttl=5)
+    monkeypatch.setattr("app.cache.time.monotonic", lambda: 100.0)
+    cache.set("a", 1)
+    monkeypatch.setattr("app.cache.time.monotonic", lambda: 106.0)
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+
+
+def test_cache_never_stores_expired_link():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1, expires_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+    assert cache.get("a") is None
+
+
+def test_cache_respects_link_expiry(monkeypatch):
+    cache = TTLCache(maxsize=10, ttl=600)
+    monkeypatch.setattr("app.cache.time.monotonic", lambda: 100.0)
+    cache.set("a", 1, expires_at=datetime.now(timezone.utc) + timedelta(seconds=10))
+    monkeypatch.setattr("app.cache.time.monotonic", lambda: 120.0)
+    assert cache.get("a") is None
+
+
+def test_cache_pop():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    assert cache.pop("a") == 1
+    assert cache.get("a") is None
@@ -0,0 +1,84 @@
+import pytest
+from unittest.mock import AsyncMock
+
+from app.links.clicks import ClickBuffer
+
+
+@pytest.mark.asyncio
+async def test_click_buffer_accumulates_and_flushes(monkeypatch):
+    add_clicks = AsyncMock(return_value=2)
+    monkeypatch.setattr("app.links.dao.LinksDAO.add_clicks", add_clicks)
+    buffer = ClickBuffer(flush_interval=60, flush_threshold=100, max_pending=100)
+
+    await buffer.add("abc")
+    await buffer.add("abc")
+    await buffer.add("def")
+    assert buffer.pending == 2
+
+    assert await buffer.flush() == 2
+    add_clicks.assert_awaited_once_with({"abc": 2, "def": 1})
+    assert buffer.pending == 0
+    assert buffer.flushed_clicks == 3
+
+
+@pytest.mark.asyncio
+async def test_click_buffer_keeps_clicks_on_failure(monkeypatch):
+    monkeypatch.setattr("app.links.dao.LinksDAO.add_clicks", AsyncMock(side_effect=Exception("db down")))
+    buffer = ClickBuffer(flush_interval=60, flush_threshold=100, max_pending=100)
+
+    await buffer.add("abc")
+    assert await buffer.flush() == 0
+    assert buffer.pending == 1
+    assert buffer.failed_flushes == 1
+
+
+@pytest.mark.asyncio
+async def test_click_buffer_flushes_when_full(monkeypatch):
+    add_clicks = AsyncMock(return_value=1)
+    monkeypatch.setattr("app.links.dao.LinksDAO.add_clicks", add_clicks)
+    buffer = ClickBuffer(flush_interval=60, flush_threshold=100, max_pending=1)
+
+    await buffer.add("abc")
+    await buffer.add("def")
+    add_clicks.assert_awaited_once_with({"abc": 1})
+    assert buffer.pending == 1
+
+
+def test_strict_redirect_single_statement(client, monkeypatch):
+    row = type("Row", (), {"original_URL": "https://example.com"})()
+    increment = AsyncMock(return_value=row)
+    find = AsyncMock()
+    monkeypatch.setattr("app.config.settings.CLICK_MODE", "strict")
+    monkeypatch.setattr("app.links.dao.LinksDAO.increment", increment)
+    monkeypatch.setattr("app.links.dao.LinksDAO.find_one_row", find)
+
+    response = client.get("/links/abc123", follow_redirects=False)
+    assert response.status_code == 302
+    assert response.headers["location"] == "https://example.com"
+    increment.assert_awaited_once()
+    find.assert_not_awaited()
+
+
+def test_strict_redirect_not_found(client, monkeypatch):
+    monkeypatch.setattr("app.config.settings.CLICK_MODE", "strict")
+    monkeypatch.setattr("app.links.dao.LinksDAO.increment", AsyncMock(return_value=None))
+
+    response = client.get("/links/abc123", follow_redirects=False)
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_click_buffer_bounded_while_db_down(monkeypatch):
+    add_clicks = AsyncMock(side_effect=Exception("db down"))
+    monkeypatch.setattr("app.links.dao.LinksDAO.add_clicks", add_clicks)
+    buffer = ClickBuffer(flush_interval=60, flush_threshold=100, max_pending=2)
+
+    for short_code in ("a", "b", "c", "d", "e"):
+        await buffer.add(short_code)
+    # одна неудачная попытка, дальше пауза: переходы сверх лимита отбрасываются, а не ждут БД
+    add_clicks.assert_awaited_once()
+    assert buffer.pending == 2
+    assert buffer.dropped_clicks == 3
+
+    await buffer.add("a")
+    assert buffer.stats()["pending"] == 2
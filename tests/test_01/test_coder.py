@@ -0,0 +1,23 @@
+from app.links.coder import canonical_url, url_digest, URL_DIGEST_SIZE
+
+
+def test_canonical_url_lowercases_scheme_and_host():
+    assert canonical_url("HTTPS://Example.COM/Path") == "https://example.com/Path"
+
+
+def test_canonical_url_drops_default_port():
+    assert canonical_url("http://example.com:80/a") == "http://example.com/a"
+    assert canonical_url("https://example.com:443") == "https://example.com/"
+    assert canonical_url("https://example.com:8443/a") == "https://example.com:8443/a"
+
+
+def test_canonical_url_sorts_query_optionally():
+    assert canonical_url("https://a.com/?b=2&a=1", sort_query=False) == "https://a.com/?b=2&a=1"
+    assert canonical_url("https://a.com/?b=2&a=1", sort_query=True) == "https://a.com/?a=1&b=2"
+
+
+def test_url_digest_is_fixed_width_and_canonical():
+    digest = url_digest("https://example.com")
+    assert len(digest) == URL_DIGEST_SIZE
+    assert digest == url_digest("HTTPS://EXAMPLE.com:443/")
+    assert digest != url_digest("https://example.org")
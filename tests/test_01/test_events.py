@@ -0,0 +1,114 @@
+import json
+import pytest
+from unittest.mock import AsyncMock
+
+from app.links.bloom import ShortCodeFilter
+from app.links.cache import link_cache
+from app.links.events import CHANNEL, NOTIFY_CODES_CHUNK, ORIGIN, LinkEvents, publish
+from app.links.router import update_link
+
+
+@pytest.fixture
+def short_filter(monkeypatch):
+    short_filter = ShortCodeFilter(enabled=True, capacity=1000, error_rate=0.01, rebuild_interval=60)
+    monkeypatch.setattr("app.links.events.short_code_filter", short_filter)
+    return short_filter
+
+
+async def build(short_filter, monkeypatch, codes):
+    async def iter_short_codes():
+        for code in codes:
+            yield code
+    monkeypatch.setattr("app.links.dao.LinksDAO.iter_short_codes", iter_short_codes)
+    short_filter.resync(True)
+    await short_filter.rebuild()
+
+
+@pytest.mark.asyncio
+async def test_publish_splits_codes_into_payloads(monkeypatch):
+    notify = AsyncMock()
+    monkeypatch.setattr("app.links.dao.LinksDAO.notify", notify)
+    codes = [f"code{i}" for i in range(NOTIFY_CODES_CHUNK + 1)]
+
+    await publish('add', codes)
+
+    channel, payloads = notify.await_args.args
+    assert channel == CHANNEL
+    assert [json.loads(p)['codes'] for p in payloads] == [codes[:NOTIFY_CODES_CHUNK], codes[NOTIFY_CODES_CHUNK:]]
+    assert all(len(p.encode()) < 8000 for p in payloads)
+
+
+@pytest.mark.asyncio
+async def test_other_workers_changes_reach_filter(short_filter, monkeypatch):
+    await build(short_filter, monkeypatch, ["old"])
+    link_cache.set("old", ("https://example.com", None))
+    events = LinkEvents(ping_interval=1)
+
+    events.apply(json.dumps({'origin': 'other', 'op': 'add', 'codes': ["new"]}))
+    events.apply(json.dumps({'origin': 'other', 'op': 'remove', 'codes': ["old"]}))
+
+    assert short_filter.might_contain("new")
+    assert not short_filter.might_contain("old")
+    assert link_cache.pop("old") is None
+    assert events.received == 2
+
+
+@pytest.mark.asyncio
+async def test_own_notifications_are_skipped(short_filter, monkeypatch):
+    await build(short_filter, monkeypatch, [])
+    LinkEvents(ping_interval=1).apply(json.dumps({'origin': ORIGIN, 'op': 'add', 'codes': ["mine"]}))
+    assert not short_filter.might_contain("mine")
+
+
+@pytest.mark.asyncio
+async def test_filter_unused_without_subscription(short_filter, monkeypatch):
+    await build(short_filter, monkeypatch, ["abc"])
+    assert not short_filter.might_contain("zzz")
+
+    # подписка оборвалась: уведомления могли потеряться, 404 по фильтру больше не отдаём
+    short_filter.resync(False)
+    assert short_filter.might_contain("zzz")
+
+
+@pytest.mark.asyncio
+async def test_rebuild_started_before_reconnect_is_discarded(short_filter, monkeypatch):
+    async def iter_short_codes():
+        # подписка переподключилась, пока читалась таблица
+        short_filter.resync(True)
+        yield "abc"
+    monkeypatch.setattr("app.links.dao.LinksDAO.iter_short_codes", iter_short_codes)
+    short_filter.resync(True)
+
+    await short_filter.rebuild()
+    assert not short_filter.ready
+
+
+def test_invalidate_drops_cached_url():
+    link_cache.set("moved", ("https://old.com", None))
+    LinkEvents(ping_interval=1).apply(json.dumps({'origin': 'other', 'op': 'invalidate', 'codes': ["moved"]}))
+    assert link_cache.pop("moved") is None
+
+
+@pytest.mark.asyncio
+async def test_update_link_invalidates_other_workers(monkeypatch):
+    monkeypatch.setattr("app.links.dao.LinksDAO.update", AsyncMock(return_value=1))
+    notify = AsyncMock()
+    monkeypatch.setattr("app.links.dao.LinksDAO.notify", notify)
+    link_cache.set("moved", ("https://old.com", None))
+
+    await update_link("moved", "https://new.com")
+
+    payload = json.loads(notify.await_args.args[1][0])
+    assert (payload['op'], payload['codes']) == ('invalidate', ["moved"])
+    assert link_cache.pop("moved") is None
+
+
+@pytest.mark.asyncio
+async def test_rebuild_event_drops_filter_until_rebuilt(short_filter, monkeypatch):
+    await build(short_filter, monkeypatch, ["abc"])
+    assert not short_filter.might_contain("imported")
+
+    LinkEvents(ping_interval=1).apply(json.dumps({'origin': 'other', 'op': 'rebuild', 'codes': []}))
+
+    # импорт другого процесса: пока фильтр не перестроен, он не отвечает "нет"
+    assert short_filter.might_contain("imported")
@@ -0,0 +1,117 @@
+import pytest
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+from app.links.cache import link_cache
+from app.links.expiry import sweep_expired_links, sweep_stats, is_expired, ExpiryScheduler
+from app.links.models import Link
+
+
+@pytest.mark.asyncio
+async def test_sweep_deletes_in_chunks(monkeypatch):
+    monkeypatch.setattr("app.links.dao.LinksDAO.notify", AsyncMock())
+    delete_expired = AsyncMock(side_effect=[["a", "b"], ["c", "d"], ["e"]])
+    monkeypatch.setattr("app.links.dao.LinksDAO.delete_expired", delete_expired)
+    link_cache.set("a", ("https://example.com", None))
+
+    assert await sweep_expired_links(chunk_size=2) == 5
+    assert delete_expired.await_count == 3
+    assert "a" not in link_cache
+    assert sweep_stats["last_sweep_rows"] == 5
+
+
+@pytest.mark.asyncio
+async def test_sweep_nothing_expired(monkeypatch):
+    delete_expired = AsyncMock(return_value=[])
+    monkeypatch.setattr("app.links.dao.LinksDAO.delete_expired", delete_expired)
+
+    assert await sweep_expired_links(chunk_size=100) == 0
+    delete_expired.assert_awaited_once_with(100)
+
+
+def test_is_expired():
+    now = datetime.now(timezone.utc)
+    assert not is_expired(None)
+    assert is_expired(now - timedelta(seconds=1))
+    assert not is_expired(now + timedelta(minutes=1))
+
+
+@pytest.mark.asyncio
+async def test_scheduler_expires_due_links(monkeypatch):
+    monkeypatch.setattr("app.links.dao.LinksDAO.notify", AsyncMock())
+    now = datetime.now(timezone.utc)
+    Row = namedtuple("Row", ["expires_at", "id", "short_URL"])
+    monkeypatch.setattr("app.links.dao.LinksDAO.find_expiring", AsyncMock(return_value=[
+        Row(now - timedelta(seconds=1), 1, "old"),
+        Row(now + timedelta(minutes=1), 2, "new"),
+    ]))
+    delete_codes = AsyncMock(return_value=["old"])
+    monkeypatch.setattr("app.links.dao.LinksDAO.delete_expired_codes", delete_codes)
+    scheduler = ExpiryScheduler(horizon=300, batch_size=100, rescan_interval=10)
+
+    await scheduler.load()
+    assert scheduler.pending == 2
+    assert await scheduler.expire_due() == 1
+    delete_codes.assert_awaited_once_with(["old"])
+    assert scheduler.pending == 1
+
+
+@pytest.mark.asyncio
+async def test_scheduler_schedules_only_inside_loaded_window(monkeypatch):
+    monkeypatch.setattr("app.links.dao.LinksDAO.find_expiring", AsyncMock(return_value=[]))
+    scheduler = ExpiryScheduler(horizon=300, batch_size=100, rescan_interval=10)
+    now = datetime.now(timezone.utc)
+
+    scheduler.schedule("early", now + timedelta(seconds=10))
+    assert scheduler.pending == 0
+
+    await scheduler.load()
+    scheduler.schedule("soon", now + timedelta(seconds=10))
+    scheduler.schedule("later", now + timedelta(hours=1))
+    assert scheduler.pending == 1
+
+
+@pytest.mark.asyncio
+async def test_scheduler_rescan_skips_scheduled_codes(monkeypatch):
+    now = datetime.now(timezone.utc)
+    Row = namedtuple("Row", ["expires_at", "id", "short_URL"])
+    find_expiring = AsyncMock(return_value=[Row(now + timedelta(minutes=1), 1, "a")])
+    monkeypatch.setattr("app.links.dao.LinksDAO.find_expiring", find_expiring)
+    scheduler = ExpiryScheduler(horizon=300, batch_size=100, rescan_interval=10)
+
+    await scheduler.load()
+    find_expiring.return_value = [Row(now + timedelta(minutes=1), 1, "a"),
+                                  Row(now + timedelta(minutes=2), 2, "from_other_worker")]
+    await scheduler.load()
+    assert scheduler.pending == 2
+    # второе сканирование начинается с момента первого, а не с конца окна
+    assert find_expiring.await_args_list[1].args[0] == find_expiring.await_args_list[0].args[0]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_forgets_only_deleted_codes(monkeypatch):
+    monkeypatch.setattr("app.links.dao.LinksDAO.notify", AsyncMock())
+    now = datetime.now(timezone.utc)
+    Row = namedtuple("Row", ["expires_at", "id", "short_URL"])
+    monkeypatch.setattr("app.links.dao.LinksDAO.find_expiring", AsyncMock(return_value=[
+        Row(now - timedelta(seconds=2), 1, "swept"),
+        Row(now - timedelta(seconds=1), 2, "live"),
+    ]))
+    monkeypatch.setattr("app.links.dao.LinksDAO.delete_expired_codes", AsyncMock(return_value=["live"]))
+    forget = MagicMock()
+    monkeypatch.setattr("app.links.expiry.forget_links", forget)
+    scheduler = ExpiryScheduler(horizon=300, batch_size=100, rescan_interval=10)
+
+    await scheduler.load()
+    assert await scheduler.expire_due() == 1
+    forget.assert_called_once_with(["live"])
+
+
+def test_redirect_treats_expired_link_as_missing(client, monkeypatch):
+    link = Link(original_URL="https://example.com", short_URL="gone12",
+                expires_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+    monkeypatch.setattr("app.links.dao.LinksDAO.find_one_row", AsyncMock(return_value=link))
+
+    response = client.get("/links/gone12", follow_redirects=False)
+    assert response.status_code == 404
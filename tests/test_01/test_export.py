@@ -0,0 +1,49 @@
+import json
+from datetime import datetime
+
+from app.links.models import Link
+
+
+def make_link(link_id):
+    return Link(id=link_id, original_URL=f"https://example.com/{link_id}", short_URL=f"code{link_id}",
+                clicks=link_id, is_registered=False, id_user=None, expires_at=None,
+                created_at=datetime.now(), updated_at=datetime.now())
+
+
+def fake_iter_all(links, calls):
+    async def iter_all(batch_size=1000, **filter_by):
+        calls.append(filter_by)
+        for link in links:
+            yield link
+    return iter_all
+
+
+def test_export_ndjson(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr("app.links.dao.LinksDAO.iter_all", fake_iter_all([make_link(1), make_link(2)], calls))
+
+    response = client.get("/links/export", params={"id_user": 3})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["short_URL"] for line in lines] == ["code1", "code2"]
+    assert calls == [{"id_user": 3}]
+
+
+def test_export_csv(client, monkeypatch):
+    monkeypatch.setattr("app.links.dao.LinksDAO.iter_all", fake_iter_all([make_link(1)], []))
+
+    response = client.get("/links/export", params={"format": "csv"})
+
+    lines = response.text.splitlines()
+    assert lines[0].startswith("id,original_URL,short_URL,clicks")
+    assert lines[1].startswith("1,https://example.com/1,code1,1")
+
+
+def test_export_csv_empty_table_has_header(client, monkeypatch):
+    monkeypatch.setattr("app.links.dao.LinksDAO.iter_all", fake_iter_all([], []))
+
+    response = client.get("/links/export", params={"format": "csv"})
+
+    assert response.text.startswith("id,original_URL")
@@ -0,0 +1,97 @@
+import io
+
+import pytest
+
+from app.links.coder import url_digest
+from app.links.importer import import_links
+from app.main import app
+from app.users.dependencies import get_current_admin_user
+
+
+def fake_import_records(collected):
+    async def import_records(records):
+        async for record in records:
+            collected.append(record)
+        return {"inserted": len(collected), "skipped": 0, "conflicting": 0}
+    return import_records
+
+
+def reader(data: bytes):
+    source = io.BytesIO(data)
+
+    async def read(size):
+        return source.read(size)
+    return read
+
+
+@pytest.mark.asyncio
+async def test_import_csv_streams_records(monkeypatch):
+    collected = []
+    monkeypatch.setattr("app.links.dao.LinksDAO.import_records", fake_import_records(collected))
+    data = (b"original_URL,short_URL,clicks,expires_at,id_user\r\n"
+            b"https://example.com/a,aaa111,3,2030-01-01T00:00:00,7\r\n"
+            b"https://example.com/b,bbb222,,,\r\n"
+            b",ccc333,1,,\r\n"
+            b"https://example.com/d,ddd444,many,,\r\n")
+
+    report = await import_links(reader(data), "csv")
+
+    assert report == {"inserted": 2, "skipped": 0, "conflicting": 0, "invalid": 2}
+    url, digest, code, clicks, expires_at, id_user = collected[0]
+    assert (url, code, clicks, id_user) == ("https://example.com/a", "aaa111", 3, 7)
+    assert digest == url_digest(url)
+    assert expires_at.tzinfo is not None
+    assert collected[1][3:] == (0, None, None)
+
+
+@pytest.mark.asyncio
+async def test_import_ndjson_splits_lines_across_chunks(monkeypatch):
+    collected = []
+    monkeypatch.setattr("app.links.dao.LinksDAO.import_records", fake_import_records(collected))
+    monkeypatch.setattr("app.links.importer.READ_CHUNK_SIZE", 7)
+    data = (b'{"original_URL": "https://example.com/a", "short_URL": "aaa111"}\n'
+            b'not json\n'
+            b'{"original_URL": "https://example.com/b", "short_URL": "bbb222", "clicks": 5}')
+
+    report = await import_links(reader(data), "ndjson")
+
+    assert report["invalid"] == 1
+    assert [record[2] for record in collected] == ["aaa111", "bbb222"]
+
+
+@pytest.mark.asyncio
+async def test_import_rejects_rows_the_api_would_reject(monkeypatch):
+    collected = []
+    monkeypatch.setattr("app.links.dao.LinksDAO.import_records", fake_import_records(collected))
+    long_url = "https://example.com/" + "a" * 200
+    data = (b"original_URL,short_URL,clicks,expires_at,id_user\n"
+            + f"{long_url},long01,0,,\n".encode()
+            + b"https://example.com/b," + b"c" * 31 + b",0,,\n"
+            + b"https://example.com/c,neg001,-1,,\n"
+            + b"https://example.com/d,usr001,0,,0\n"
+            + b"https://example.com/e,ok0001,0,,\n")
+
+    report = await import_links(reader(data), "csv")
+
+    assert report["invalid"] == 4
+    assert [record[2] for record in collected] == ["ok0001"]
+
+
+def test_import_endpoint_requires_admin(client):
+    response = client.post("/links/import", files={"file": ("links.csv", b"original_URL,short_URL\n")})
+    assert response.status_code == 401
+
+
+def test_import_endpoint(client, monkeypatch):
+    collected = []
+    monkeypatch.setattr("app.links.dao.LinksDAO.import_records", fake_import_records(collected))
+    app.dependency_overrides[get_current_admin_user] = lambda: object()
+    try:
+        response = client.post("/links/import",
+                               files={"file": ("links.ndjson", b'{"original_URL": "https://a.com", "short_URL": "a1"}\n')})
+    finally:
+        app.dependency_overrides.pop(get_current_admin_user)
+
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 1
+    assert collected[0][2] == "a1"
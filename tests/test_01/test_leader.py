@@ -0,0 +1,81 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.pool import NullPool
+
+from app.config import get_direct_db_url, settings
+from app.database import direct_engine, engine
+from app.leader import LeaderLock, run_as_leader
+
+
+def fake_engine(locked: bool):
+    connection = AsyncMock()
+    connection.execution_options.return_value = connection
+    result = MagicMock()
+    result.scalar.return_value = locked
+    connection.execute.return_value = result
+    engine = MagicMock()
+    engine.connect = AsyncMock(return_value=connection)
+    return engine, connection
+
+
+@pytest.mark.asyncio
+async def test_leader_lock_acquired(monkeypatch):
+    engine, connection = fake_engine(locked=True)
+    monkeypatch.setattr("app.leader.direct_engine", engine)
+    lock = LeaderLock("job", renew_timeout=1)
+
+    assert await lock.try_acquire()
+    assert lock.is_leader
+    connection.close.assert_not_awaited()
+    assert await lock.renew()
+
+
+@pytest.mark.asyncio
+async def test_leader_lock_busy_releases_connection(monkeypatch):
+    engine, connection = fake_engine(locked=False)
+    monkeypatch.setattr("app.leader.direct_engine", engine)
+    lock = LeaderLock("job", renew_timeout=1)
+
+    assert not await lock.try_acquire()
+    assert not lock.is_leader
+    connection.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_leader_lock_lost_on_dead_connection(monkeypatch):
+    engine, connection = fake_engine(locked=True)
+    monkeypatch.setattr("app.leader.direct_engine", engine)
+    lock = LeaderLock("job", renew_timeout=1)
+    await lock.try_acquire()
+
+    connection.execute.side_effect = Exception("connection lost")
+    assert not await lock.renew()
+    assert not lock.is_leader
+
+
+def test_leader_lock_key_is_stable():
+    assert LeaderLock("job", 1).key == LeaderLock("job", 1).key
+    assert LeaderLock("job", 1).key != LeaderLock("other", 1).key
+
+
+def test_locks_bypass_request_pool():
+    assert direct_engine is not engine
+    assert isinstance(direct_engine.sync_engine.pool, NullPool)
+
+
+def test_pgbouncer_needs_direct_url(monkeypatch):
+    monkeypatch.setattr(settings, "DB_PGBOUNCER", True)
+    monkeypatch.setattr(settings, "DB_DIRECT_URL", "")
+    assert get_direct_db_url() == ""
+    monkeypatch.setattr(settings, "DB_DIRECT_URL", "postgresql+asyncpg://u:p@db:5432/db")
+    assert get_direct_db_url() == "postgresql+asyncpg://u:p@db:5432/db"
+
+
+@pytest.mark.asyncio
+async def test_pgbouncer_without_direct_url_skips_leader_jobs(monkeypatch):
+    monkeypatch.setattr("app.leader.direct_engine", None)
+    job = AsyncMock()
+
+    await run_as_leader("job", job, renew_interval=0.01)
+    job.assert_not_called()
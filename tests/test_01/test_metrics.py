@@ -0,0 +1,59 @@
+import pytest
+
+from app.dao.base import BaseDAO
+from app.metrics import Histogram, current_dao_call, dao_call_duration, dao_errors_total, render_metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "test", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5.0, "/a")
+
+    lines = histogram.render()
+
+    assert 'test_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{route="/a",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{route="/a"} 3' in lines
+
+
+def test_metrics_use_route_template(client):
+    client.get("/stats/pool")
+    client.get("/no/such/path")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert 'http_requests_total{method="GET",route="/stats/pool",status="200"}' in response.text
+    assert 'route="unmatched",status="404"' in response.text
+    assert "app_db_pool_checked_out 0" in response.text
+    assert "app_link_cache_hits" in response.text
+
+
+class ProbeDAO(BaseDAO):
+    @classmethod
+    async def outer(cls):
+        return await cls.inner()
+
+    @classmethod
+    async def inner(cls):
+        return current_dao_call.get()
+
+    @classmethod
+    async def broken(cls):
+        raise RuntimeError("boom")
+
+
+@pytest.mark.asyncio
+async def test_dao_methods_are_timed():
+    assert await ProbeDAO.outer() == ("ProbeDAO", "outer")
+    with pytest.raises(RuntimeError):
+        await ProbeDAO.broken()
+
+    assert sum(dao_call_duration.counts[("ProbeDAO", "outer")]) == 1
+    # вложенный вызов учитывается во внешнем
+    assert ("ProbeDAO", "inner") not in dao_call_duration.counts
+    assert dao_errors_total.values[("ProbeDAO", "broken")] == 1
+    assert current_dao_call.get() is None
+    assert 'dao="ProbeDAO",method="outer"' in render_metrics()
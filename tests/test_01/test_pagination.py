@@ -0,0 +1,72 @@
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from app.links.coder import url_digest
+from app.links.dao import LinksDAO
+from app.links.models import Link
+from app.links.router import decode_cursor, encode_cursor
+
+
+def make_link(link_id):
+    return Link(id=link_id, original_URL=f"https://example.com/{link_id}", short_URL=f"code{link_id}",
+                clicks=0, is_registered=False, id_user=None, expires_at=None,
+                created_at=datetime.now(), updated_at=datetime.now())
+
+
+def test_cursor_roundtrip():
+    assert decode_cursor(encode_cursor(12345)) == 12345
+
+
+def test_get_all_links_returns_next_cursor(client, monkeypatch):
+    find_page = AsyncMock(return_value=[make_link(1), make_link(2)])
+    monkeypatch.setattr("app.links.dao.LinksDAO.find_page", find_page)
+
+    response = client.get("/links/", params={"limit": 2})
+
+    assert response.status_code == 200
+    assert [link["short_URL"] for link in response.json()] == ["code1", "code2"]
+    assert decode_cursor(response.headers["X-Next-Cursor"]) == 2
+    find_page.assert_awaited_once_with(2, None)
+
+
+def test_get_all_links_last_page_has_no_cursor(client, monkeypatch):
+    find_page = AsyncMock(return_value=[make_link(3)])
+    monkeypatch.setattr("app.links.dao.LinksDAO.find_page", find_page)
+
+    response = client.get("/links/", params={"limit": 2, "cursor": encode_cursor(2), "id_user": 7})
+
+    assert response.status_code == 200
+    assert "X-Next-Cursor" not in response.headers
+    find_page.assert_awaited_once_with(2, 2, id_user=7)
+
+
+def test_get_all_links_projection(client, monkeypatch):
+    find_page = AsyncMock(return_value=[SimpleNamespace(id=1, short_URL="code1", clicks=4)])
+    monkeypatch.setattr("app.links.dao.LinksDAO.find_page", find_page)
+
+    response = client.get("/links/", params={"fields": "short_URL,clicks", "limit": 1})
+
+    assert response.json() == [{"short_URL": "code1", "clicks": 4}]
+    assert find_page.await_args.args[2] == ("id", "short_URL", "clicks")
+    assert "X-Next-Cursor" in response.headers
+
+
+def test_get_all_links_rejects_bad_input(client):
+    assert client.get("/links/", params={"fields": "password"}).status_code == 400
+    assert client.get("/links/", params={"cursor": "@@@"}).status_code == 400
+    assert client.get("/links/", params={"limit": 100000}).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_url_filter_uses_hash_index(monkeypatch):
+    find_page = AsyncMock(return_value=[])
+    monkeypatch.setattr("app.dao.base.BaseDAO.find_page", find_page)
+
+    await LinksDAO.find_page(10, None, original_URL="HTTPS://Example.com:443")
+
+    find_page.assert_awaited_once_with(10, None, (), original_URL_hash=url_digest("https://example.com/"))
+    query, params = LinksDAO._select_by({'original_URL': "https://example.com"})
+    assert 'original_URL_hash' in str(query)
+    assert params == {'original_URL_hash': url_digest("https://example.com")}
@@ -0,0 +1,69 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.dialects import postgresql
+
+from app.database import current_session
+from app.links.dao import LinksDAO
+from app.links.partitions import bucket_start, partition_name, partition_start, maintain_partitions
+
+
+def test_bucket_start_aligns_to_width():
+    moment = datetime(2026, 10, 18, 15, 30, tzinfo=timezone.utc)
+    start = bucket_start(moment, days=7)
+    assert start <= moment < start + timedelta(days=7)
+    assert bucket_start(start + timedelta(days=6, hours=23), days=7) == start
+
+
+def test_partition_name_round_trip():
+    start = datetime(2026, 10, 15, tzinfo=timezone.utc)
+    assert partition_name(start) == "links_p20261015"
+    assert partition_start(partition_name(start)) == start
+
+
+@pytest.mark.asyncio
+async def test_maintain_partitions_creates_ahead_and_drops_old(monkeypatch):
+    monkeypatch.setattr("app.config.settings.LINKS_PARTITION_DAYS", 7)
+    monkeypatch.setattr("app.config.settings.LINKS_PARTITION_PREMAKE", 2)
+    current = bucket_start(datetime.now(timezone.utc), days=7)
+    old = partition_name(current - timedelta(days=7))
+    monkeypatch.setattr("app.links.partitions.links_partitioned", AsyncMock(return_value=True))
+    monkeypatch.setattr("app.links.partitions.list_partitions",
+                        AsyncMock(return_value=[old, partition_name(current)]))
+    create = AsyncMock()
+    drop = AsyncMock(return_value=10)
+    monkeypatch.setattr("app.links.partitions.create_partition", create)
+    monkeypatch.setattr("app.links.partitions.drop_partition", drop)
+
+    await maintain_partitions()
+    assert [call.args[0] for call in create.await_args_list] == [
+        current + timedelta(days=7), current + timedelta(days=14)
+    ]
+    drop.assert_awaited_once_with(old)
+
+
+@pytest.mark.asyncio
+async def test_maintenance_skipped_for_plain_table(monkeypatch):
+    monkeypatch.setattr("app.links.partitions.links_partitioned", AsyncMock(return_value=False))
+    list_partitions = AsyncMock()
+    monkeypatch.setattr("app.links.partitions.list_partitions", list_partitions)
+
+    await maintain_partitions()
+    list_partitions.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_partitioned_sweep_only_touches_default_partition(monkeypatch):
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=MagicMock())
+    monkeypatch.setattr(LinksDAO, "partitioned", True)
+    token = current_session.set(session)
+    try:
+        await LinksDAO.delete_expired(100)
+    finally:
+        current_session.reset(token)
+
+    sql = str(session.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("DELETE FROM links_default")
+    assert "FROM links " not in sql
@@ -0,0 +1,39 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from app.users.auth import PasswordHasher
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_in_thread_pool(monkeypatch):
+    monkeypatch.setattr("app.users.auth.pwd_context", CryptContext(schemes=["bcrypt"], bcrypt__rounds=4))
+    hasher = PasswordHasher(workers=1, max_pending=4)
+
+    hashed = await hasher.hash("secret")
+
+    assert hashed.startswith("$2b$04$")
+    assert await hasher.verify("secret", hashed) is True
+    assert await hasher.verify("wrong", hashed) is False
+    assert hasher.stats()["completed"] == 3
+
+
+@pytest.mark.asyncio
+async def test_full_queue_sheds_load():
+    hasher = PasswordHasher(workers=1, max_pending=1)
+    gate = threading.Event()
+    busy = asyncio.create_task(hasher._run(gate.wait, 5))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await hasher._run(lambda: None)
+
+    gate.set()
+    await busy
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers["Retry-After"] == "1"
+    assert hasher.stats()["rejected"] == 1
+    assert hasher.pending == 0
@@ -0,0 +1,42 @@
+import pytest
+from unittest.mock import MagicMock
+
+from app.config import settings
+from app.database import TimedQueuePool, engine, engine_options
+
+
+def test_engine_uses_pool_settings():
+    pool = engine.sync_engine.pool
+    assert isinstance(pool, TimedQueuePool)
+    assert pool.size() == settings.DB_POOL_SIZE
+    assert pool._max_overflow == settings.DB_MAX_OVERFLOW
+
+
+def test_statement_cache_size_goes_to_dialect_cache():
+    connect_args = engine_options()["connect_args"]
+    assert connect_args == {"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+
+
+def test_wait_counters_are_per_pool():
+    primary, replica = TimedQueuePool(MagicMock), TimedQueuePool(MagicMock)
+    replica.connect().close()
+    assert replica.waits == 1
+    assert primary.waits == 0
+
+
+def test_pgbouncer_disables_statement_cache(monkeypatch):
+    monkeypatch.setattr(settings, "DB_PGBOUNCER", True)
+    connect_args = engine_options()["connect_args"]
+    assert connect_args["statement_cache_size"] == 0
+    assert connect_args["prepared_statement_cache_size"] == 0
+    name_func = connect_args["prepared_statement_name_func"]
+    assert name_func() != name_func()
+
+
+def test_pool_stats_endpoint(client):
+    response = client.get("/stats/pool")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["size"] == settings.DB_POOL_SIZE
+    assert data["checked_out"] == 0
+    assert "wait_seconds_total" in data
@@ -0,0 +1,43 @@
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from app.links.dao import LinksDAO
+from app.links.router import REDIRECT_COLUMNS, SEARCH_COLUMNS, STAT_COLUMNS
+
+
+def test_projection_selects_only_requested_columns():
+    query, params = LinksDAO._select_by({"short_URL": "abc123"}, REDIRECT_COLUMNS)
+
+    sql = str(query)
+    assert sql.startswith('SELECT links."original_URL", links.expires_at \nFROM links')
+    assert params == {"short_URL": "abc123"}
+    assert query is not LinksDAO._select_by({"short_URL": "abc123"})[0]
+
+
+def test_redirect_reads_projection(client, monkeypatch):
+    find_one_row = AsyncMock(return_value=SimpleNamespace(original_URL="https://example.com", expires_at=None))
+    monkeypatch.setattr("app.links.dao.LinksDAO.find_one_row", find_one_row)
+
+    response = client.get("/links/proj01", follow_redirects=False)
+
+    assert response.status_code == 302
+    find_one_row.assert_awaited_once_with(REDIRECT_COLUMNS, short_URL="proj01")
+
+
+def test_stats_and_search_read_projection(client, monkeypatch):
+    now = datetime.now()
+    row = SimpleNamespace(id=1, original_URL="https://example.com", short_URL="abc123", clicks=3,
+                          expires_at=None, is_registered=False, id_user=None, created_at=now, updated_at=now)
+    find_one_row = AsyncMock(return_value=row)
+    find_row_by_url = AsyncMock(return_value=row)
+    monkeypatch.setattr("app.links.dao.LinksDAO.find_one_row", find_one_row)
+    monkeypatch.setattr("app.links.dao.LinksDAO.find_row_by_url", find_row_by_url)
+
+    stats = client.get("/links/abc123/stats")
+    search = client.get("/links/search", params={"url": "https://example.com"})
+
+    assert stats.json()["clicks"] == 3
+    assert find_one_row.await_args.args[0] == STAT_COLUMNS
+    assert search.json()["short_URL"] == "abc123"
+    assert find_row_by_url.await_args.args == ("https://example.com", SEARCH_COLUMNS)
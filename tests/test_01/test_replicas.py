@@ -0,0 +1,111 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+import app.database as database
+from app.database import ReplicaSet, primary_reads, session_scope, use_primary
+
+REPLICA_URLS = ["postgresql+asyncpg://u:p@replica1:5432/db", "postgresql+asyncpg://u:p@replica2:5432/db"]
+
+
+def test_round_robin_skips_unhealthy_replicas():
+    replicas = ReplicaSet(REPLICA_URLS)
+    first, second = replicas.session_makers
+
+    assert [replicas.session_maker() for _ in range(4)] == [first, second, first, second]
+
+    replicas.healthy[0] = False
+    assert {replicas.session_maker() for _ in range(3)} == {second}
+
+    replicas.healthy[1] = False
+    assert replicas.session_maker() is database.async_session_maker
+    assert replicas.primary_fallbacks == 1
+
+
+@pytest.mark.asyncio
+async def test_health_check_marks_replicas(monkeypatch):
+    replicas = ReplicaSet(REPLICA_URLS)
+
+    async def ping(replica_engine):
+        if replica_engine.url.host == "replica1":
+            raise OSError("connection refused")
+    monkeypatch.setattr(replicas, "_ping", ping)
+
+    await replicas.check()
+
+    assert replicas.healthy == [False, True]
+    assert [r["healthy"] for r in replicas.stats()] == [False, True]
+
+
+def fake_session_maker(session):
+    maker = MagicMock()
+    maker.return_value.__aenter__ = AsyncMock(return_value=session)
+    maker.return_value.__aexit__ = AsyncMock(return_value=False)
+    return maker
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_replica_until_write(monkeypatch):
+    primary, replica = MagicMock(), MagicMock()
+    primary.begin.return_value.__aenter__ = AsyncMock()
+    primary.begin.return_value.__aexit__ = AsyncMock(return_value=False)
+    monkeypatch.setattr(database, "async_session_maker", fake_session_maker(primary))
+    replicas = ReplicaSet(REPLICA_URLS[:1])
+    replicas.session_makers = [fake_session_maker(replica)]
+    monkeypatch.setattr(database, "replica_set", replicas)
+
+    async def scenario():
+        async with session_scope() as before_write:
+            pass
+        with primary_reads():
+            async with session_scope() as forced:
+                pass
+        async with session_scope(write=True):
+            pass
+        async with session_scope() as after_write:
+            pass
+        return before_write, forced, after_write
+
+    before_write, forced, after_write = await asyncio.create_task(scenario())
+
+    assert before_write is replica
+    assert forced is primary
+    assert after_write is primary
+    assert use_primary.get() is False
+
+
+@pytest.mark.asyncio
+async def test_primary_reads_after_write_expire(monkeypatch):
+    primary, replica = MagicMock(), MagicMock()
+    primary.begin.return_value.__aenter__ = AsyncMock()
+    primary.begin.return_value.__aexit__ = AsyncMock(return_value=False)
+    monkeypatch.setattr(database, "async_session_maker", fake_session_maker(primary))
+    replicas = ReplicaSet(REPLICA_URLS[:1])
+    replicas.session_makers = [fake_session_maker(replica)]
+    monkeypatch.setattr(database, "replica_set", replicas)
+    monkeypatch.setattr(database.settings, "DB_REPLICA_READ_YOUR_WRITES", 0.0)
+
+    async def background_loop():
+        async with session_scope(write=True):
+            pass
+        async with session_scope() as later_read:
+            return later_read
+
+    # фоновая задача после записи возвращается на реплику, когда окно read-your-writes истекло
+    assert await asyncio.create_task(background_loop()) is replica
+
+
+def test_redirect_cache_filled_from_primary(client, monkeypatch):
+    seen = []
+
+    async def find_one_row(columns, **filter_by):
+        seen.append(use_primary.get())
+        return SimpleNamespace(original_URL="https://example.com", expires_at=None)
+    monkeypatch.setattr("app.links.dao.LinksDAO.find_one_row", find_one_row)
+    monkeypatch.setattr("app.links.router.click_buffer.add", AsyncMock())
+
+    response = client.get("/links/prim01", follow_redirects=False)
+    assert response.status_code == 302
+    assert seen == [True]
@@ -0,0 +1,94 @@
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+
+from fastapi.testclient import TestClient
+
+from app.database import current_session, session_scope
+from app.links.cache import link_cache
+from app.links.dao import LinksDAO
+from app.links.models import Link
+from app.main import app
+
+
+@pytest.mark.asyncio
+async def test_session_scope_reuses_request_session():
+    session = MagicMock()
+    token = current_session.set(session)
+    try:
+        async with session_scope(write=True) as first:
+            pass
+        async with session_scope() as second:
+            pass
+        async with session_scope(write=True, shared=False) as own:
+            pass
+    finally:
+        current_session.reset(token)
+    assert first is session
+    assert second is session
+    assert own is not session
+
+
+@pytest.mark.asyncio
+async def test_dao_calls_share_request_session():
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = None
+    result.rowcount = 1
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=result)
+    token = current_session.set(session)
+    try:
+        await LinksDAO.find_all_in("short_URL", ["abc123"])
+        await LinksDAO.delete(short_URL="abc123")
+    finally:
+        current_session.reset(token)
+    assert session.execute.await_count == 2
+    session.commit.assert_not_called()
+
+
+def fake_session_maker(commit_error=None):
+    session = MagicMock()
+    session.info = {}
+
+    @asynccontextmanager
+    async def begin():
+        yield
+        if commit_error is not None:
+            raise commit_error
+    session.begin = begin
+    maker = MagicMock()
+    maker.return_value.__aenter__ = AsyncMock(return_value=session)
+    maker.return_value.__aexit__ = AsyncMock(return_value=False)
+    return maker
+
+
+def delete_link(monkeypatch, commit_error=None, deleted=1):
+    monkeypatch.setattr("app.links.dao.LinksDAO.notify", AsyncMock())
+    link = Link(original_URL="https://example.com", short_URL="txn123", is_registered=False, id_user=None)
+    monkeypatch.setattr("app.database.async_session_maker", fake_session_maker(commit_error))
+    monkeypatch.setattr("app.links.dao.LinksDAO.find_one_or_none", AsyncMock(return_value=link))
+    monkeypatch.setattr("app.links.dao.LinksDAO.delete", AsyncMock(return_value=deleted))
+    link_cache.set("txn123", ("https://example.com", None))
+    return TestClient(app, raise_server_exceptions=False).delete("/links/txn123")
+
+
+def test_commit_failure_reaches_client(monkeypatch):
+    response = delete_link(monkeypatch, commit_error=RuntimeError("commit failed"))
+    assert response.status_code == 500
+    # без COMMIT кэш не трогаем
+    assert link_cache.pop("txn123") is not None
+
+
+def test_cache_invalidated_after_commit(monkeypatch):
+    response = delete_link(monkeypatch)
+    assert response.status_code == 200
+    assert link_cache.pop("txn123") is None
+
+
+def test_filter_untouched_when_nothing_deleted(monkeypatch):
+    forget = MagicMock()
+    monkeypatch.setattr("app.links.router.forget_links", forget)
+    response = delete_link(monkeypatch, deleted=0)
+    assert response.status_code == 200
+    forget.assert_not_called()
+    assert link_cache.pop("txn123") is None
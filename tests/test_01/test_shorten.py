@@ -0,0 +1,49 @@
+from unittest.mock import AsyncMock
+
+from app.links.models import Link
+
+
+def test_shorten_creates_link_in_one_statement(client, monkeypatch):
+    monkeypatch.setattr("app.links.dao.LinksDAO.notify", AsyncMock())
+    monkeypatch.setattr("app.links.allocator.short_code_allocator.next_code", AsyncMock(return_value="abc123"))
+    insert_or_get = AsyncMock(return_value=(Link(short_URL="abc123"), True))
+    find = AsyncMock()
+    monkeypatch.setattr("app.links.dao.LinksDAO.insert_or_get", insert_or_get)
+    monkeypatch.setattr("app.links.dao.LinksDAO.find_one_or_none", find)
+
+    response = client.post("/links/shorten", json={"original_URL": "https://example.com"})
+    assert response.status_code == 200
+    assert response.json()["link"]["short_URL"] == "abc123"
+    insert_or_get.assert_awaited_once()
+    find.assert_not_awaited()
+
+
+def test_shorten_is_idempotent_for_existing_url(client, monkeypatch):
+    existing = Link(original_URL="https://example.com", short_URL="old123", clicks=3,
+                    is_registered=False, id_user=None, expires_at=None)
+    monkeypatch.setattr("app.links.allocator.short_code_allocator.next_code", AsyncMock(return_value="abc123"))
+    monkeypatch.setattr("app.links.dao.LinksDAO.insert_or_get", AsyncMock(return_value=(existing, False)))
+
+    response = client.post("/links/shorten", json={"original_URL": "https://example.com"})
+    assert response.status_code == 200
+    assert response.json()["link"]["short_URL"] == "old123"
+
+
+def test_shorten_alias_taken(client, monkeypatch):
+    monkeypatch.setattr("app.links.dao.LinksDAO.insert_or_get", AsyncMock(return_value=(None, False)))
+
+    response = client.post("/links/shorten", json={"original_URL": "https://example.com", "alias": "taken"})
+    assert response.status_code == 401
+
+
+def test_shorten_retries_generated_code_conflict(client, monkeypatch):
+    monkeypatch.setattr("app.links.dao.LinksDAO.notify", AsyncMock())
+    monkeypatch.setattr("app.links.allocator.short_code_allocator.next_code",
+                        AsyncMock(side_effect=["taken1", "free22"]))
+    insert_or_get = AsyncMock(side_effect=[(None, False), (Link(short_URL="free22"), True)])
+    monkeypatch.setattr("app.links.dao.LinksDAO.insert_or_get", insert_or_get)
+
+    response = client.post("/links/shorten", json={"original_URL": "https://example.com"})
+    assert response.status_code == 200
+    assert response.json()["link"]["short_URL"] == "free22"
+    assert insert_or_get.await_count == 2
@@ -0,0 +1,18 @@
+from app.links.dao import LinksDAO
+
+
+def test_select_is_reused_per_filter_keys():
+    first, params = LinksDAO._select_by({"short_URL": "abc123", "id_user": 1})
+    second, other_params = LinksDAO._select_by({"id_user": 2, "short_URL": "def456"})
+
+    assert first is second
+    assert params == {"short_URL": "abc123", "id_user": 1}
+    assert other_params == {"id_user": 2, "short_URL": "def456"}
+
+
+def test_none_filter_compiles_to_is_null():
+    query, params = LinksDAO._select_by({"id_user": None})
+
+    assert "links.id_user IS NULL" in str(query)
+    assert params == {}
+    assert query is not LinksDAO._select_by({"id_user": 5})[0]
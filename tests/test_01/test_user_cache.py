@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.users.auth import decode_token, get_user_by_id
+from app.users.cache import token_cache, user_cache
+from app.users.dao import UsersDAO
+from app.users.dependencies import get_current_user
+from app.users.models import User
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    user_cache.clear()
+    token_cache.clear()
+    yield
+    user_cache.clear()
+    token_cache.clear()
+
+
+def test_decode_token_verifies_once(monkeypatch):
+    decode = MagicMock(return_value={"sub": "1", "exp": int((datetime.now(timezone.utc) + timedelta(hours=1)).timestamp())})
+    monkeypatch.setattr("app.users.auth.jwt.decode", decode)
+
+    assert decode_token("token")["sub"] == "1"
+    assert decode_token("token")["sub"] == "1"
+    decode.assert_called_once()
+
+
+def test_expired_claims_are_not_cached(monkeypatch):
+    decode = MagicMock(return_value={"sub": "1", "exp": 1234567890})
+    monkeypatch.setattr("app.users.auth.jwt.decode", decode)
+
+    decode_token("token")
+    decode_token("token")
+    assert decode.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_current_user_hits_db_once(monkeypatch):
+    find = AsyncMock(return_value=User(id=1, is_admin=False))
+    monkeypatch.setattr("app.users.dao.UsersDAO.find_one_or_none_by_id", find)
+    decode = MagicMock(return_value={"sub": "1", "exp": int((datetime.now(timezone.utc) + timedelta(hours=1)).timestamp())})
+    monkeypatch.setattr("app.users.auth.jwt.decode", decode)
+
+    first = await get_current_user(token="valid.token")
+    second = await get_current_user(token="valid.token")
+
+    assert first is second
+    find.assert_awaited_once_with(1)
+    decode.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_user_update_invalidates_cache(monkeypatch):
+    find = AsyncMock(side_effect=[User(id=1, is_admin=False), User(id=1, is_admin=True)])
+    monkeypatch.setattr("app.users.dao.UsersDAO.find_one_or_none_by_id", find)
+    monkeypatch.setattr("app.dao.base.BaseDAO.update", AsyncMock(return_value=1))
+
+    assert (await get_user_by_id(1)).is_admin is False
+    await UsersDAO.update({"id": 1}, is_admin=True)
+    assert (await get_user_by_id(1)).is_admin is True
+
+
+@pytest.mark.asyncio
+async def test_user_delete_by_other_field_clears_cache(monkeypatch):
+    monkeypatch.setattr("app.dao.base.BaseDAO.delete", AsyncMock(return_value=1))
+    user_cache.set(1, User(id=1))
+    user_cache.set(2, User(id=2))
+
+    await UsersDAO.delete(email="someone@example.com")
+
+    assert len(user_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_cached_user_survives_request_rollback(monkeypatch):
+    user = User(id=1, email="user@example.com", is_admin=False)
+    make_transient_to_detached(user)
+    request_session = Session()
+    request_session.add(user)
+    monkeypatch.setattr("app.users.dao.UsersDAO.find_one_or_none_by_id", AsyncMock(return_value=user))
+
+    await get_user_by_id(1)
+    # обработчик упал: откат просрочивает объекты сессии, закрытие их отсоединяет
+    request_session.rollback()
+    request_session.close()
+
+    cached = await get_user_by_id(1)
+    assert cached.id == 1
+    assert cached.email == "user@example.com"